@@ -1,21 +1,46 @@
-import glob
+from concurrent.futures import ThreadPoolExecutor
+from copy import deepcopy
+from functools import partial
+import io
 import os
 from pathlib import Path
+import sys
+import threading
 import yaml
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, TextIO, Union
 import warnings
 
-from .data_interface import MagicDataInterface
+from .data_interface import COMPRESSION_EXTENSIONS, MagicDataInterface, YAMLDumper, YAMLSafeLoader
 from .self_aware_data import SelfAwareData, SelfAwareDataInterface
 
 
 DIRS_TO_IGNORE = ['__pycache__']
 
+# directories with more subdirectories than this have them created in parallel
+PARALLEL_CHARACTERIZE_THRESHOLD = 16
+PARALLEL_CHARACTERIZE_MAX_WORKERS = 8
+_characterize_executor = None
+_characterize_executor_lock = threading.Lock()
+
+
+def _get_characterize_executor() -> ThreadPoolExecutor:
+    """Get the thread pool shared by all DataDirectories for characterizing directories, creating it on first use."""
+    global _characterize_executor
+    if _characterize_executor is None:
+        # concurrent first callers must not each create a pool
+        with _characterize_executor_lock:
+            if _characterize_executor is None:
+                _characterize_executor = ThreadPoolExecutor(max_workers=PARALLEL_CHARACTERIZE_MAX_WORKERS)
+    return _characterize_executor
+
 
 class DataDirectoryManager:
 
     config_file_name = '.data_map.yaml'
 
+    # (config path, st_mtime_ns, st_size, parsed config) of the last config file read
+    _config_cache = None
+
     @classmethod
     def register_project(cls, project_hint: str, project_path: str) -> None:
         """
@@ -34,19 +59,22 @@ class DataDirectoryManager:
         if not expanded_project_path.exists():
             raise FileNotFoundError("Not a valid path: '{}'".format(project_path))
 
-        config_file_path = Path(Path.home(), cls.config_file_name)
-        if not config_file_path.exists():
-            cls._init_config()
+        config_file_path = cls._get_config_path()
+        try:
+            config = cls._load_config()
+        except FileNotFoundError:
+            print("Creating config at {}".format(config_file_path))
+            config = {}
 
-        config = cls._load_config()
         hint_already_in_file = cls._check_for_entry_in_config(project_hint, config)
         if hint_already_in_file:
             raise ValueError("Project hint '{}' is already registered".format(project_hint))
 
-        cls._register_project_to_file(project_hint, expanded_project_path, config_file_path)
+        cls._register_project_to_file(project_hint, expanded_project_path, config_file_path, config)
+        cls._config_cache = None
 
     @classmethod
-    def load_project_path_from_hint(cls, hint):
+    def load_project_path_from_hint(cls, hint: str) -> Path:
         """
         Determine the data_path from the hint.
           Look for a data_map config, and look for hint within the config.
@@ -60,17 +88,22 @@ class DataDirectoryManager:
 
         """
 
-        if cls._config_exists():
+        # the parsed config is cached, so this costs a single stat of the config file when it hasn't changed
+        try:
             config = cls._load_config()
-            if config is not None and hint in config:
-                expanded_config_path = Path(config[hint]['path']).expanduser().resolve()
-                if expanded_config_path.exists():
-                    return expanded_config_path
-                else:
-                    raise ValueError("Path provided in config for '{}' does not exist: {}".format(hint,
-                                                                                                  expanded_config_path))
+        except FileNotFoundError:
+            config = None
+        if config is not None and hint in config:
+            expanded_config_path = Path(config[hint]['path']).expanduser().resolve()
+            if expanded_config_path.exists():
+                return expanded_config_path
+            else:
+                raise ValueError("Path provided in config for '{}' does not exist: {}".format(hint,
+                                                                                              expanded_config_path))
 
-        expanded_path = Path(hint).expanduser().resolve()
+        # only look up the home directory if the path refers to it
+        path = os.fspath(hint)
+        expanded_path = Path(os.path.expanduser(path) if '~' in path else path).resolve()
         if expanded_path.exists():
             return expanded_path
 
@@ -88,16 +121,21 @@ class DataDirectoryManager:
             print("{}: {}".format(project_hint, config[project_hint]['path']))
 
     @classmethod
-    def _init_config(cls):
+    def _get_config_path(cls) -> Path:
+        """Get the path of the config file in the user's home directory."""
+        return Path.home() / cls.config_file_name
+
+    @classmethod
+    def _init_config(cls) -> None:
         """Create an empty config file."""
-        config_path = Path(Path.home(), cls.config_file_name)
+        config_path = cls._get_config_path()
         print("Creating config at {}".format(config_path))
-        open(config_path.__str__(), 'x').close()
+        open(os.fspath(config_path), 'x').close()
 
     @classmethod
     def _config_exists(cls) -> bool:
         """Determine whether a config file exists"""
-        config_path = Path(Path.home(), cls.config_file_name)
+        config_path = cls._get_config_path()
         if config_path.exists():
             return True
         else:
@@ -105,16 +143,29 @@ class DataDirectoryManager:
 
     @classmethod
     def _load_config(cls) -> Dict:
-        """Load the config file. If config file is empty, return an empty dict."""
-        config_path = Path(Path.home(), cls.config_file_name)
-        if cls._config_exists():
-            config = yaml.safe_load(open(config_path.__str__()))
-            if config is None:
-                config = {}
-            return config
-        else:
+        """
+        Load the config file. If config file is empty, return an empty dict.
+        The parsed config is cached until the file's modification time or size changes. Callers get their own copy,
+        which they are free to modify.
+        """
+        config_path = cls._get_config_path()
+        try:
+            stat = config_path.stat()
+        except FileNotFoundError:
             raise FileNotFoundError('Config file not found at: {}'.format(config_path))
 
+        cache_key = (os.fspath(config_path), stat.st_mtime_ns, stat.st_size)
+        if cls._config_cache is not None and cls._config_cache[:3] == cache_key:
+            return deepcopy(cls._config_cache[3])
+
+        # let libyaml decode the file itself, and close it right away
+        with open(os.fspath(config_path), 'rb') as f:
+            config = yaml.load(f, Loader=YAMLSafeLoader)
+        if config is None:
+            config = {}
+        cls._config_cache = (*cache_key, config)
+        return deepcopy(config)
+
     @staticmethod
     def _check_for_entry_in_config(project_hint: str, config: Dict) -> bool:
         """
@@ -143,25 +194,46 @@ class DataDirectoryManager:
             raise ValueError("Project hint '{}' is not registered".format(project_hint))
 
     @staticmethod
-    def _register_project_to_file(project_hint: str, project_path: Path, config_file_path: Path):
+    def _register_project_to_file(project_hint: str, project_path: Path, config_file_path: Path,
+                                  config: Dict = None) -> None:
         """
-        Appends project details to specified config file.
+        Adds project details to specified config file.
+        The config is written to a temporary file which then replaces the config file, so an interrupted write can't
+         leave a half-written config behind.
 
         Args:
             project_hint: The name for the project.
             project_path: Path to project data directory.
             config_file_path: Path to config file.
+            config: The current contents of the config file. If not provided, it is read from config_file_path.
 
         Returns: None.
 
         """
+        if config is None:
+            try:
+                with open(os.fspath(config_file_path), 'rb') as f:
+                    config = yaml.load(f, Loader=YAMLSafeLoader)
+            except FileNotFoundError:
+                config = None
+            if config is None:
+                config = {}
+
         config_entry_data = {
             project_hint: {
-                'path': project_path.__str__(),
+                'path': os.fspath(project_path),
             }
         }
-        with open(config_file_path.__str__(), 'a') as f:
-            yaml.dump(config_entry_data, f, default_flow_style=False)
+        tmp_file_path = '{}.{}.tmp'.format(os.fspath(config_file_path), os.getpid())
+        try:
+            with open(tmp_file_path, 'w') as f:
+                yaml.dump({**config, **config_entry_data}, f, Dumper=YAMLDumper, default_flow_style=False,
+                          sort_keys=False)
+            os.replace(tmp_file_path, os.fspath(config_file_path))
+        except BaseException:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
 
 
 class TestingDataDirectoryManager(DataDirectoryManager):
@@ -176,7 +248,8 @@ class TestingDataDirectoryManager(DataDirectoryManager):
         return {'test': '.'}
 
     @staticmethod
-    def _register_project_to_file(project_hint: str, project_path: Path, config_file_path: Path):
+    def _register_project_to_file(project_hint: str, project_path: Path, config_file_path: Path,
+                                  config: Dict = None):
         return
 
 
@@ -186,28 +259,51 @@ class DataDirectory:
     data_dir_manager = DataDirectoryManager
 
     def __init__(self, path: str, contents: Dict[str, 'DataDirectory'] = None,
-                 magic_data_interface=MagicDataInterface):
+                 magic_data_interface=MagicDataInterface, name: str = None, _from_parent: bool = False):
         """
-        Initialize a DataDirectory at a path. The contents of that DataDirectory are recursively characterized and the
-        DataDirectory's data_type set. For testing purposes, the contents can also be set directly.
+        Initialize a DataDirectory at a path. The contents of that DataDirectory are characterized lazily, the first
+        time they are accessed, and the DataDirectory's data_type is determined from them on demand. For testing
+        purposes, the contents can also be set directly.
 
         Args:
             path: A file path at which to instantiate the DataDirectory.
             contents: The files and subdirectories contained in the directory.
             magic_data_interface: MagicDataInterface object to use to interface with files.
+            name: The name of the directory, if already known. Defaults to the basename of the path.
+            _from_parent: Internal. Whether the path was built by the parent DataDirectory from its own resolved path
+                and a directory entry, in which case it is used as is rather than resolved and checked for existence.
         """
-        self.path = Path(path).expanduser().resolve()
-        if not self.path.exists():
-            warnings.warn('DataDirectory path does not exist: {}'.format(self.path), RuntimeWarning)
-        self.name = os.path.basename(self.path)
-        if contents is None:
-            self.contents = self._characterize_dir(self.path)
+        if _from_parent:
+            self.path = path
         else:
-            self.contents = contents
-        # determine_data_type has to be done _after_ characterize dir because it inspects the children
-        self.data_type = self._determine_data_type()
+            self.path = Path(path).expanduser().resolve()
+            if not self.path.exists():
+                warnings.warn('DataDirectory path does not exist: {}'.format(self.path), RuntimeWarning)
+        self.name = name if name is not None else os.path.basename(self.path)
+        self._contents = contents
+        self._data_type = None
         self.magic_data_interface = magic_data_interface
 
+    @property
+    def contents(self) -> Dict[str, 'DataDirectory']:
+        """The files and subdirectories contained in the directory, characterized on first access."""
+        if self._contents is None:
+            self._contents = self._characterize_dir(self.path)
+        return self._contents
+
+    @contents.setter
+    def contents(self, contents: Dict[str, 'DataDirectory']) -> None:
+        self._contents = contents
+        self._data_type = None
+
+    @property
+    def data_type(self) -> str:
+        """The data type of the directory, determined on first access."""
+        # determine_data_type inspects the children, so this triggers characterizing the dir if not done yet
+        if self._data_type is None:
+            self._data_type = self._determine_data_type()
+        return self._data_type
+
     @classmethod
     def register_project(cls, project_hint: str, project_path: str) -> None:
         """Register a hint for a project data directory so that it can be easily reloaded via `load(hint)`."""
@@ -219,37 +315,54 @@ class DataDirectory:
         return cls.data_dir_manager.list_projects()
 
     @classmethod
-    def load_project(cls, hint):
+    def load_project(cls, hint: str) -> 'DataDirectory':
         """Create a DataDirectory from a project hint previously registered via `register_project`."""
         path = cls.data_dir_manager.load_project_path_from_hint(hint)
         return cls(path)
 
     @classmethod
-    def load(cls, hint):
+    def load(cls, hint: str) -> 'DataDirectory':
         """Shortcut for `load_project`."""
         return cls.load_project(hint)
 
-    def __getitem__(self, key):
+    def __getitem__(self, key: str) -> Union['DataDirectory', 'DataFile']:
         return self.contents[key]
 
-    def reload(self):
-        self.contents = self._characterize_dir(self.path)
+    def reload(self) -> None:
+        """Forget the characterized contents, so that they are re-read from the file system on next access."""
+        self.contents = None
+
+    def refresh(self) -> None:
+        """
+        Update the characterized contents with changes made on the file system. Unlike `reload`, the existing objects
+        for files and subdirectories that are still there are kept, so the metadata of SelfAwareDataDirectories is not
+        read again. Every characterized directory is re-read, as modification times can miss changes, while
+        subdirectories that have not been characterized yet are left to be characterized on first access.
+        """
+        if self._contents is None:
+            return
+        self.contents = self._characterize_dir(self.path, existing_contents=self._contents)
+        for item in self._contents.values():
+            item.refresh()
 
-    def is_file(self):
+    def is_file(self) -> bool:
         return False
 
     def _determine_data_type(self) -> str:
-        dir_data_types = [self.contents[f].data_type for f in self.contents]
-        unique_dir_data_types = list(set(dir_data_types))
+        unique_dir_data_types = set()
+        for item in self.contents.values():
+            unique_dir_data_types.add(item.data_type)
+            # stop as soon as the answer is known, so the remaining children don't need to determine their data_type
+            if len(unique_dir_data_types) > 1:
+                return 'mixed'
         if len(unique_dir_data_types) == 0:
             return 'empty'
-        elif len(unique_dir_data_types) > 1:
-            return 'mixed'
         else:
-            return unique_dir_data_types[0]
+            return next(iter(unique_dir_data_types))
 
     def select(self, hint: str) -> Union['DataDirectory', 'DataFile']:
         """Return the DataDirectory from self.contents that matches the hint.
+        If the hint is the exact name of a file, that file is returned.
         If more than one file matches the hint, then select the one that file whose type matches the hint exactly.
         Otherwise raise an error and display all matches.
 
@@ -260,13 +373,17 @@ class DataDirectory:
             FileNotFoundError: if no file can be found in the data directory that matches the hint.
             ValueError: if more than one file is found in the data directory that matches the hint.
         """
-        matches = [self.contents[d] for d in self.contents if hint in self.contents[d].name]
+        if hint in self.contents:
+            return self.contents[hint]
+
+        matches = [item for item in self.contents.values() if hint in item.name]
         if len(matches) == 1:
             return matches[0]
         elif len(matches) == 0:
             raise FileNotFoundError("No match for hint '{}'".format(hint))
         elif len(matches) > 1:
-            exact_matches = [self.contents[d] for d in self.contents if hint == self.contents[d].data_type]
+            # only the candidate matches need their data_type determined, not every item in the directory
+            exact_matches = [m for m in matches if hint == m.data_type]
 
             if len(exact_matches) == 1:
                 return exact_matches[0]
@@ -282,8 +399,7 @@ class DataDirectory:
         if len(self.contents) == 0:
             return None
 
-        sorted_contents = sorted([d for d in self.contents])
-        latest_content = sorted_contents[-1]
+        latest_content = max(self.contents)
         return self.contents[latest_content]
 
     def save(self, data: Any, file_name: str, **kwargs) -> None:
@@ -303,16 +419,17 @@ class DataDirectory:
         else:
             new_data_dir = self._save_file(data, file_name, **kwargs)
         self.contents[new_data_dir.name] = new_data_dir
+        self._data_type = None
 
     def _save_file(self, data: Any, file_name: str, **kwargs) -> 'DataFile':
-        saved_file_path = self.magic_data_interface.save(data, str(Path(self.path, file_name)), **kwargs)
+        saved_file_path = self.magic_data_interface.save(data, os.path.join(self.path, file_name), **kwargs)
         return DataFile(saved_file_path)
 
     def _save_self_aware_data(self, data: Any, file_name: str, **kwargs) -> 'SelfAwareDataDirectory':
         new_transform_dir_path = SelfAwareDataInterface.save(data, parent_path=self.path, file_name=file_name, **kwargs)
         return SelfAwareDataDirectory(new_transform_dir_path)
 
-    def mkdir(self, dir_name: str):
+    def mkdir(self, dir_name: str) -> None:
         """
         Create a new directory within the current directory.
         Args:
@@ -324,39 +441,78 @@ class DataDirectory:
         dir_path = Path(self.path, dir_name)
         os.makedirs(dir_path)
         self.contents[dir_name] = DataDirectory(dir_path)
+        self._data_type = None
 
     @staticmethod
-    def _characterize_dir(path) -> Dict[str, 'DataDirectory']:
+    def _characterize_dir(path, existing_contents: Dict[str, 'DataDirectory'] = None) -> Dict[str, 'DataDirectory']:
         """
         Characterize the contents of the DataDirectory, creating new DataDirectories for subdirectories and DataFiles
         for files.
 
         Args:
             path: File path to characterize.
+            existing_contents: Optional, previously characterized contents of the directory. Objects for files and
+                subdirectories that still exist are reused rather than created again.
 
         Returns: A Dictionary of file/directory names (str) to DataDirectory/DataFile objects.
 
         """
+        path = Path(path)
         contents = {}
-        glob_path = Path(path, '*')
-        subpaths = glob.glob(glob_path.__str__())
-        for p in subpaths:
-            name = os.path.basename(p)
-            if name in DIRS_TO_IGNORE:
-                continue
-            if os.path.isdir(p):
-                if 'sad_dir' in p or 'transformed_data_dir' in p:
-                    data_directory = SelfAwareDataDirectory(p)
+        subdir_entries = []
+        # contents are keyed by display name, which for SelfAwareDataDirectories differs from the name on disk
+        existing_items = {}
+        if existing_contents is not None:
+            existing_items = {item.path.name: item for item in existing_contents.values()}
+        # os.scandir yields DirEntry objects whose is_dir/is_file are answered from the directory listing itself,
+        # saving a stat call per child compared to glob + os.path.isdir/isfile
+        try:
+            entries = os.scandir(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return contents
+        with entries:
+            for entry in entries:
+                name = entry.name
+                # glob skipped hidden files, keep it that way
+                if name.startswith('.') or name in DIRS_TO_IGNORE:
+                    continue
+                existing_item = existing_items.get(name)
+                if entry.is_dir():
+                    if existing_item is not None and not existing_item.is_file():
+                        contents[existing_item.name] = existing_item
+                    else:
+                        subdir_entries.append(name)
+                elif entry.is_file():
+                    if existing_item is not None and existing_item.is_file():
+                        contents[name] = existing_item
+                    else:
+                        # the child path is built from the already resolved parent path, so that creating a DataFile
+                        # costs no resolve or exists round-trips to the file system
+                        contents[name] = DataFile(path / name, name=name, _from_parent=True)
                 else:
-                    data_directory = DataDirectory(p)
-                contents[data_directory.name] = data_directory
-            elif os.path.isfile(p):
-                contents[name] = DataFile(p)
-            else:
-                print('WARNING: {} is neither a file nor a directory.'.format(p))
+                    print('WARNING: {} is neither a file nor a directory.'.format(entry.path))
+
+        # creating a SelfAwareDataDirectory reads its metadata files. That is blocking I/O, so for directories with
+        # many subdirectories it is spread over a thread pool.
+        # Subdirectory contents are characterized lazily, so the workers never submit nested jobs to the pool.
+        create_subdir = partial(DataDirectory._create_subdir, path)
+        if len(subdir_entries) > PARALLEL_CHARACTERIZE_THRESHOLD:
+            subdirs = _get_characterize_executor().map(create_subdir, subdir_entries)
+        else:
+            subdirs = map(create_subdir, subdir_entries)
+        for data_directory in subdirs:
+            contents[data_directory.name] = data_directory
         return contents
 
-    def ls(self, full=False) -> None:
+    @staticmethod
+    def _create_subdir(parent_path: Path, name: str) -> 'DataDirectory':
+        path = parent_path / name
+        if 'sad_dir' in name or 'transformed_data_dir' in name:
+            return SelfAwareDataDirectory(path, _from_parent=True)
+        else:
+            return DataDirectory(path, name=name, _from_parent=True)
+
+    def ls(self, full: bool = False) -> None:
         """
         Print the contents of the data directory. Defaults to printing all subdirectories, but not all files.
 
@@ -365,7 +521,10 @@ class DataDirectory:
 
         """
         contents_ls_tree = self._build_ls_tree(full=full)
-        self._print_ls_tree(contents_ls_tree)
+        # render the whole tree into memory and write it out once, rather than a print call per line
+        ls_output = io.StringIO()
+        self._print_ls_tree(contents_ls_tree, out=ls_output)
+        sys.stdout.write(ls_output.getvalue())
 
     def _build_ls_tree(self, full: bool = False, top_dir: bool = True) -> Dict[str, List]:
         """
@@ -385,16 +544,16 @@ class DataDirectory:
         contents_ls_tree = []
 
         if len(self.contents) > 0:
-            contains_subdirs = any([not self.contents[c].is_file() for c in self.contents])
+            contains_subdirs = any(not item.is_file() for item in self.contents.values())
             if contains_subdirs or full or (top_dir and not contains_subdirs):
                 # build all directories first
-                dirs = [self.contents[item] for item in self.contents if not self.contents[item].is_file()]
+                dirs = [item for item in self.contents.values() if not item.is_file()]
                 dirs_sorted = sorted(dirs, key=lambda k: k.name)
                 for d in dirs_sorted:
                     contents_ls_tree.append(d._build_ls_tree(full=full, top_dir=False))
 
                 # ... then collect all files
-                files = [self.contents[item] for item in self.contents if self.contents[item].is_file()]
+                files = [item for item in self.contents.values() if item.is_file()]
                 files_sorted = sorted(files, key=lambda k: k.name)
                 for f in files_sorted:
                     contents_ls_tree.append(f.name)
@@ -403,39 +562,42 @@ class DataDirectory:
 
         return {self.name: contents_ls_tree}
 
-    def _print_ls_tree(self, ls_tree: Dict[str, List], indent: int = 0) -> None:
+    def _print_ls_tree(self, ls_tree: Dict[str, List], indent: int = 0, out: TextIO = None) -> None:
         """
         Recursively print the ls_tree dictionary as created by `_build_ls_tree`.
         Args:
             ls_tree: Dict describing a DataDirectory contents.
             indent: indent level to print with at the current level of recursion.
+            out: File-like object to write to. Defaults to stdout.
 
         Returns: None. Prints!
 
         """
+        if out is None:
+            out = sys.stdout
         if type(ls_tree) == str:
-            print('{}{}'.format(' ' * 4 * indent, ls_tree))
+            out.write('{}{}\n'.format(' ' * 4 * indent, ls_tree))
         else:
             for key in ls_tree:
                 contents = ls_tree[key]
                 if len(contents) == 0:
-                    print('{}{}'.format(' ' * 4 * indent, key))
+                    out.write('{}{}\n'.format(' ' * 4 * indent, key))
                 else:
-                    print('{}{}/'.format(' ' * 4 * indent, key))
+                    out.write('{}{}/\n'.format(' ' * 4 * indent, key))
                     for item in contents:
-                        self._print_ls_tree(item, indent+1)
+                        self._print_ls_tree(item, indent+1, out)
 
 
 class SelfAwareDataDirectory(DataDirectory):
     """Subclass of `DataDirectory` that manages interacting with the file expression of SelfAwareData."""
 
-    def __init__(self, path, contents=None):
-        super().__init__(path, contents)
+    def __init__(self, path: str, contents: Dict[str, 'DataDirectory'] = None, _from_parent: bool = False):
+        super().__init__(path, contents, _from_parent=_from_parent)
 
         # Overwrite the name (normally os.path.basename) with effective file name
         self.name = SelfAwareDataInterface.get_printable_filename(self.path)
 
-    def _determine_data_type(self):
+    def _determine_data_type(self) -> str:
         return SelfAwareDataInterface.get_data_type(self.path)
 
     def load(self, data_interface_hint: str = None, load_function: bool = True, **kwargs) -> 'SelfAwareData':
@@ -463,23 +625,40 @@ class SelfAwareDataDirectory(DataDirectory):
 
 class DataFile(DataDirectory):
 
-    def __init__(self, path, contents=None):
-        super().__init__(path, contents)
+    def __init__(self, path: str, contents: Dict[str, 'DataDirectory'] = None, name: str = None,
+                 _from_parent: bool = False):
+        # a file has no contents to characterize
+        if contents is None:
+            contents = {}
+        super().__init__(path, contents, name=name, _from_parent=_from_parent)
 
-    def __getitem__(self, key):
+    def __getitem__(self, key: str) -> None:
         raise NotADirectoryError('This is a file!')
 
+    def refresh(self) -> None:
+        # a file has no contents to update
+        return
+
     def is_file(self) -> bool:
         return True
 
-    def _determine_data_type(self):
-        root, ext = os.path.splitext(self.name)
-        if ext != '':
-            return ext.replace('.', '')
+    def _determine_data_type(self) -> str:
+        root, dot, ext = self.name.rpartition('.')
+        if root != '' and ext != '':
+            if ext.lower() in COMPRESSION_EXTENSIONS:
+                # compressed files are typed by both of their extensions, as in 'csv.gz'
+                inner_root, dot, inner_ext = root.rpartition('.')
+                if inner_root != '' and inner_ext != '':
+                    ext = '{}.{}'.format(inner_ext, ext)
+                elif self.name.lower() in self.magic_data_interface.registered_interfaces:
+                    # named just like a compressed file extension, like 'pkl.zst', which is how file hints treat it
+                    ext = self.name
+            # many files share a handful of extensions, so share one string object per extension
+            return sys.intern(ext)
         else:
             return 'unknown'
 
-    def load(self, data_interface_hint=None, **kwargs) -> Any:
+    def load(self, data_interface_hint: str = None, **kwargs) -> Any:
         """
         Load a data file.
 
@@ -1,51 +1,206 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+import importlib.util
+import io
+import mmap
 import pandas as pd
-from pathlib import Path, PosixPath
+from pathlib import PurePath
 import pickle
+import pickletools
+import re
 import dill
 import os
-from typing import Type, Any
+import struct
+import threading
+from types import MappingProxyType
+from typing import Any, BinaryIO, Callable, Iterator, List, Optional, Tuple, Type
+import warnings
 import yaml
 
 
+# buffer size for reading and writing files, large enough to amortize read/write syscalls on big payloads
+IO_BUFFER_SIZE = 1 << 20
+# files larger than this are read ahead in full when loaded
+LARGE_FILE_SIZE = 32 << 20
+
+# text files are read and written as utf-8 regardless of locale. Undecodable bytes are carried through as surrogates
+#  rather than raising, so that they are written back out unchanged.
+TEXT_ENCODING = 'utf-8'
+TEXT_ENCODING_ERRORS = 'surrogateescape'
+TEXT_OPEN_KWARGS = {'encoding': TEXT_ENCODING, 'errors': TEXT_ENCODING_ERRORS, 'buffering': IO_BUFFER_SIZE}
+
+# data loaded with `load(..., cache=True)`, least recently used first
+LOAD_CACHE_MAX_ENTRIES = 8
+_load_cache = OrderedDict()
+_load_cache_lock = threading.Lock()
+
+# use the libyaml-backed loader and dumper when PyYAML was built with them, they are many times faster than the
+#  pure-python ones
+YAMLSafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+YAMLDumper = getattr(yaml, 'CDumper', yaml.Dumper)
+
+# extensions of compressed files, which are selected by the extension in front of them, as in 'data.csv.gz'
+COMPRESSION_EXTENSIONS = frozenset(['gz', 'bz2', 'xz', 'zst'])
+ZSTD_COMPRESSION_LEVEL = 3
+
+
+@lru_cache(maxsize=None)
+def _module_is_installed(module_name: str) -> bool:
+    """Whether an optional dependency can be imported, without importing it."""
+    return importlib.util.find_spec(module_name) is not None
+
+
+def _get_major_minor_version(version: str) -> Tuple[int, int]:
+    """Get the major and minor version numbers from a version string, ignoring any suffix such as in '2.2.0rc0'. Returns
+     (0, 0) if the version can't be parsed."""
+    match = re.match(r'(\d+)\.(\d+)', version)
+    if match is None:
+        return 0, 0
+    return int(match.group(1)), int(match.group(2))
+
+
+def _import_zstandard():
+    try:
+        import zstandard
+    except ImportError as import_error:
+        raise ImportError('zstd compressed files require zstandard to be installed separately.'
+                          '\n{}'.format(import_error))
+    return zstandard
+
+
 class DataInterfaceBase:
     """
     Govern how a data type is saved and loaded. This class is a base class for all DataInterfaces.
     """
 
     file_extension = None
+    # keyword arguments passed to every save and load of the interface, unless overridden by the caller
+    default_save_kwargs = MappingProxyType({})
+    default_load_kwargs = MappingProxyType({})
+
+    # whether saves write to a temporary file which then replaces the destination file, so that an interrupted save
+    #  never leaves a half-written file behind
+    atomic_save = True
 
     @classmethod
     def save(cls, data: Any, file_name: str, file_dir_path: str, mode: str = None, **kwargs) -> str:
         file_path = cls.construct_file_path(file_name, file_dir_path)
+        # modes that append to or update an existing file must write to the file itself
+        if not cls.atomic_save or (mode is not None and not mode.startswith('w')):
+            cls._save_with_mode(data, file_path, mode, **kwargs)
+            return file_path
+
+        tmp_file_path = cls._construct_tmp_file_path(file_path)
+        try:
+            cls._save_with_mode(data, tmp_file_path, mode, **kwargs)
+            os.replace(tmp_file_path, file_path)
+        except BaseException:
+            if os.path.exists(tmp_file_path):
+                os.remove(tmp_file_path)
+            raise
+        return file_path
+
+    @classmethod
+    def _save_with_mode(cls, data: Any, file_path: str, mode: str = None, **kwargs) -> None:
+        if cls.default_save_kwargs:
+            kwargs = {**cls.default_save_kwargs, **kwargs}
         if mode is None:
             cls._interface_specific_save(data, file_path, **kwargs)
         else:
             cls._interface_specific_save(data, file_path, mode, **kwargs)
-        return file_path
+
+    @staticmethod
+    def _construct_tmp_file_path(file_path: str) -> str:
+        """
+        Construct the path of the temporary file to save to before it replaces file_path.
+        The temporary file is hidden so it is not picked up by a DataDirectory, is unique per process and thread, and
+         keeps the file extension, which some libraries use to pick a file format or compression.
+        """
+        file_dir_path, file_name = os.path.split(file_path)
+        root, ext = os.path.splitext(file_name)
+        return os.path.join(file_dir_path, '.{}.{}-{}.tmp{}'.format(root, os.getpid(), threading.get_ident(), ext))
 
     @classmethod
     def construct_file_path(cls, file_name: str, file_dir_path: str) -> str:
         root, ext = os.path.splitext(file_name)
         if ext == '':
-            return str(Path(file_dir_path, "{}.{}".format(file_name, cls.file_extension)))
+            return os.path.join(file_dir_path, file_name + '.' + cls.file_extension)
         else:
-            return str(Path(file_dir_path, file_name))
+            return os.path.join(file_dir_path, file_name)
 
     @classmethod
     def _interface_specific_save(cls, data: Any, file_path, mode: str = None, **kwargs) -> None:
         raise NotImplementedError
 
     @classmethod
-    def load(cls, file_path: str, **kwargs) -> Any:
-        file_path = Path(file_path)
-        if not file_path.exists():
+    def load(cls, file_path: str, *, cache: bool = False, **kwargs) -> Any:
+        """
+        Load a file.
+
+        Args:
+            file_path: Path to the file to load.
+            cache: Whether to keep the loaded data in memory, and return it again as long as the file has not changed.
+                Data loaded with the cache is shared by all callers, so it should not be modified in place.
+            **kwargs: Remaining args are passed to the interface-specific load function.
+
+        Returns: The loaded data.
+
+        """
+        if cls.default_load_kwargs:
+            kwargs = {**cls.default_load_kwargs, **kwargs}
+        if not cache:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(file_path)
+            return cls._interface_specific_load(str(file_path), **kwargs)
+
+        try:
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
             raise FileNotFoundError(file_path)
-        return cls._interface_specific_load(str(file_path), **kwargs)
+        try:
+            cache_key = (cls, str(file_path), file_stat.st_mtime_ns, file_stat.st_size, tuple(sorted(kwargs.items())))
+            hash(cache_key)
+        except TypeError:
+            # kwargs that can't be hashed (like a list of columns) can't be part of the cache key
+            return cls._interface_specific_load(str(file_path), **kwargs)
+
+        with _load_cache_lock:
+            if cache_key in _load_cache:
+                _load_cache.move_to_end(cache_key)
+                return _load_cache[cache_key]
+        data = cls._interface_specific_load(str(file_path), **kwargs)
+        with _load_cache_lock:
+            _load_cache[cache_key] = data
+            if len(_load_cache) > LOAD_CACHE_MAX_ENTRIES:
+                _load_cache.popitem(last=False)
+        return data
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs) -> Any:
         raise NotImplementedError
 
+    @staticmethod
+    def _write_bytes(file_path: str, data: bytes) -> None:
+        """
+        Write bytes to a file with unbuffered OS-level writes. Cheaper than a buffered file object for the small
+         files written alongside saved data, which fit in a single write call.
+
+        Args:
+            file_path: Path of the file to (over)write.
+            data: The bytes to write.
+
+        """
+        fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        try:
+            view = memoryview(data)
+            while len(view) > 0:
+                # os.write may write fewer bytes than requested
+                bytes_written = os.write(fd, view)
+                view = view[bytes_written:]
+        finally:
+            os.close(fd)
+
 
 class TextDataInterface(DataInterfaceBase):
 
@@ -53,47 +208,217 @@ class TextDataInterface(DataInterfaceBase):
 
     @classmethod
     def _interface_specific_save(cls, data, file_path, mode='w', **kwargs):
-        with open(file_path, mode, **kwargs) as f:
+        if mode == 'w' and len(kwargs) == 0:
+            cls._write_bytes(file_path, data.encode(TEXT_ENCODING, TEXT_ENCODING_ERRORS))
+            return
+        with open(file_path, mode, **{**TEXT_OPEN_KWARGS, **kwargs}) as f:
             f.write(data)
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
-        with open(file_path, 'r', **kwargs) as f:
+        with open(file_path, 'r', **{**TEXT_OPEN_KWARGS, **kwargs}) as f:
             file = f.read()
         return file
 
 
+class ZstdTextDataInterface(DataInterfaceBase):
+    """Save and load text files compressed with zstd. Requires zstandard. Files can only be written whole, not appended
+     to."""
+
+    file_extension = 'txt.zst'
+
+    @classmethod
+    def _interface_specific_save(cls, data, file_path, mode='w', **kwargs):
+        if mode not in ('w', 'wb'):
+            raise ValueError("ZstdTextDataInterface only supports saving with mode 'w', received '{}'".format(mode))
+        zstandard = _import_zstandard()
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL)
+        cls._write_bytes(file_path, compressor.compress(data.encode(TEXT_ENCODING, TEXT_ENCODING_ERRORS)))
+
+    @classmethod
+    def _interface_specific_load(cls, file_path, **kwargs):
+        zstandard = _import_zstandard()
+        with open(file_path, 'rb', buffering=IO_BUFFER_SIZE) as f:
+            with zstandard.ZstdDecompressor().stream_reader(f, closefd=False) as reader:
+                data = reader.read()
+        return data.decode(TEXT_ENCODING, TEXT_ENCODING_ERRORS)
+
+
 class PickleDataInterface(DataInterfaceBase):
+    """
+    Save and load pickle files.
+
+    Pass `out_of_band_buffers=True` to save to write large buffers (such as the arrays backing numpy arrays and pandas
+     DataFrames) out-of-band: they are written to the file directly from the objects' memory rather than being copied
+     into the pickle stream, and are read back into fresh buffers without another copy. Such files carry a header and
+     can only be read back by datatc; plain pickle files are written by default. Requires pickle protocol 5.
+
+    Pass `optimize=True` to save to strip the unused memo opcodes from pickles smaller than `optimize_max_size`, which
+     makes pickles of many small objects around 10% smaller. Optimizing is slow, so it is off by default.
+    """
 
     file_extension = 'pkl'
+    out_of_band_magic = b'DTCPKL5\n'
+    # pickletools.optimize is pure python, larger pickles are written as they are
+    optimize_max_size = 16 << 20
 
     @classmethod
-    def _interface_specific_save(cls, data: Any, file_path, mode='wb+', **kwargs) -> None:
-        with open(file_path, mode, **kwargs) as f:
-            pickle.dump(data, f)
+    def _interface_specific_save(cls, data: Any, file_path, mode='wb', protocol: int = pickle.HIGHEST_PROTOCOL,
+                                 out_of_band_buffers: bool = False, optimize: bool = False, **kwargs) -> None:
+        if optimize and not out_of_band_buffers and mode == 'wb' and len(kwargs) == 0:
+            pickled = pickle.dumps(data, protocol=protocol)
+            if len(pickled) < cls.optimize_max_size:
+                pickled = pickletools.optimize(pickled)
+            cls._write_bytes(file_path, pickled)
+            return
+        with open(file_path, mode, **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
+            if out_of_band_buffers:
+                cls._dump_out_of_band(data, f, protocol)
+            else:
+                pickle.dump(data, f, protocol=protocol)
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs) -> Any:
-        with open(file_path, "rb+", **kwargs) as f:
-            return pickle.load(f)
+        with open(file_path, "rb", **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
+            if f.peek(len(cls.out_of_band_magic)).startswith(cls.out_of_band_magic):
+                return cls._load_out_of_band(f)
+            try:
+                # unpickle straight from the page cache, rather than through many reads into a user space buffer
+                file_map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                # empty files can't be mapped, let pickle raise its usual error
+                return pickle.load(f)
+            with file_map:
+                if len(file_map) > LARGE_FILE_SIZE and hasattr(mmap, 'MADV_WILLNEED'):
+                    # have the kernel read the whole file ahead asynchronously, keeping the disk's request queue full
+                    file_map.madvise(mmap.MADV_WILLNEED)
+                    file_map.madvise(mmap.MADV_SEQUENTIAL)
+                return pickle.loads(file_map)
+
+    @classmethod
+    def _dump_out_of_band(cls, data: Any, f: BinaryIO, protocol: int) -> None:
+        """
+        Write data as: magic, pickle length and buffer count, buffer lengths, pickle stream, buffers.
+
+        Args:
+            data: Data to pickle.
+            f: Binary file to write to.
+            protocol: Pickle protocol to use, must be at least 5.
+
+        """
+        if protocol < 5:
+            raise ValueError('Out-of-band buffers require pickle protocol 5 or higher, received {}'.format(protocol))
+        buffers = []
+        pickled = pickle.dumps(data, protocol=protocol, buffer_callback=buffers.append)
+        raw_buffers = [buffer.raw() for buffer in buffers]
+        f.write(cls.out_of_band_magic)
+        f.write(struct.pack('<QQ', len(pickled), len(raw_buffers)))
+        f.write(struct.pack('<{}Q'.format(len(raw_buffers)), *[raw_buffer.nbytes for raw_buffer in raw_buffers]))
+        f.write(pickled)
+        for raw_buffer in raw_buffers:
+            f.write(raw_buffer)
+
+    @classmethod
+    def _load_out_of_band(cls, f: BinaryIO) -> Any:
+        """Read data written by `_dump_out_of_band`."""
+        cls._read_exactly(f, len(cls.out_of_band_magic), 'header')
+        pickle_length, n_buffers = struct.unpack('<QQ', cls._read_exactly(f, 16, 'header'))
+        buffer_lengths = struct.unpack('<{}Q'.format(n_buffers), cls._read_exactly(f, 8 * n_buffers, 'header'))
+        pickled = cls._read_exactly(f, pickle_length, 'pickle')
+        buffers = []
+        for buffer_length in buffer_lengths:
+            # bytearrays, so that arrays reconstructed on top of them are writeable
+            buffer = bytearray(buffer_length)
+            if f.readinto(buffer) != buffer_length:
+                raise EOFError('Pickle file {} ended before all out-of-band buffers were read'.format(f.name))
+            buffers.append(buffer)
+        return pickle.loads(pickled, buffers=buffers)
+
+    @staticmethod
+    def _read_exactly(f: BinaryIO, size: int, part: str) -> bytes:
+        """Read `size` bytes from `f`, raising EOFError if the file is truncated."""
+        data = f.read(size)
+        if len(data) != size:
+            raise EOFError('Pickle file {} ended before its out-of-band {} was read'.format(f.name, part))
+        return data
 
 
 class DillDataInterface(DataInterfaceBase):
+    """
+    Save and load dill files.
+
+    Pass `prefer_pickle=True` to save to write objects that the standard pickle module can serialize, such as functions
+     defined at the top level of an importable module, with pickle's C implementation, which is several times faster
+     than dill. Objects that pickle can't serialize, or that reference `__main__` (and so could not be unpickled in
+     another session), are written with dill. dill reads both, so files are loaded the same way either way.
+    """
 
     file_extension = 'dill'
 
     @classmethod
-    def _interface_specific_save(cls, data: Any, file_path, mode='wb+', **kwargs) -> None:
-        with open(file_path, mode, **kwargs) as f:
-            dill.dump(data, f)
+    def _interface_specific_save(cls, data: Any, file_path, mode='wb', protocol: int = pickle.HIGHEST_PROTOCOL,
+                                 prefer_pickle: bool = False, **kwargs) -> None:
+        if prefer_pickle:
+            pickled = cls._try_pickle(data, protocol)
+            if pickled is not None:
+                with open(file_path, mode, **kwargs) as f:
+                    f.write(pickled)
+                return
+        with open(file_path, mode, **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
+            dill.dump(data, f, protocol=protocol)
+
+    @staticmethod
+    def _try_pickle(data: Any, protocol: int) -> Optional[bytes]:
+        try:
+            pickled = pickle.dumps(data, protocol=protocol)
+        except (pickle.PicklingError, AttributeError, TypeError):
+            return None
+        # pickle stores functions and classes by reference, which for __main__ only resolves in the current session
+        if b'__main__' in pickled:
+            return None
+        return pickled
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs) -> Any:
-        with open(file_path, "rb+", **kwargs) as f:
+        with open(file_path, "rb", **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
             return dill.load(f)
 
 
+class ZstdPickleDataInterface(DataInterfaceBase):
+    """
+    Save and load pickle files compressed with zstd. Requires zstandard. Pickles of most Python objects compress 2-3x,
+     which makes saving and loading faster wherever reading and writing the file is the bottleneck.
+    """
+
+    file_extension = 'pkl.zst'
+
+    @classmethod
+    def _interface_specific_save(cls, data: Any, file_path, mode='wb', protocol: int = pickle.HIGHEST_PROTOCOL,
+                                 **kwargs) -> None:
+        zstandard = _import_zstandard()
+        # compress on all cores
+        compressor = zstandard.ZstdCompressor(level=ZSTD_COMPRESSION_LEVEL, threads=-1)
+        with open(file_path, mode, **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
+            with compressor.stream_writer(f, closefd=False) as writer:
+                pickle.dump(data, writer, protocol=protocol)
+
+    @classmethod
+    def _interface_specific_load(cls, file_path, **kwargs) -> Any:
+        zstandard = _import_zstandard()
+        with open(file_path, 'rb', **{'buffering': IO_BUFFER_SIZE, **kwargs}) as f:
+            with zstandard.ZstdDecompressor().stream_reader(f, closefd=False) as reader:
+                # buffer the decompressed stream, pickle reads it in many small pieces
+                return pickle.load(io.BufferedReader(reader, IO_BUFFER_SIZE))
+
+
 class CSVDataInterface(DataInterfaceBase):
+    """
+    Save and load CSV files with pandas.
+
+    Pass `engine='pyarrow'` to load to parse the file with pyarrow's multi-threaded CSV reader, if pyarrow is installed.
+    Pass `columns` to load only a subset of the columns, and `chunksize` to get an iterator over DataFrames of at most
+     `chunksize` rows instead of loading the whole file at once (see also `load_chunks`).
+    """
 
     file_extension = 'csv'
 
@@ -101,30 +426,92 @@ class CSVDataInterface(DataInterfaceBase):
     def _interface_specific_save(cls, data, file_path, mode=None, **kwargs):
         data.to_csv(file_path, **kwargs)
 
+    @classmethod
+    def load_chunks(cls, file_path: str, chunksize: int, predicate: Callable[[pd.DataFrame], pd.Series] = None,
+                    **kwargs) -> Iterator[pd.DataFrame]:
+        """
+        Load a CSV file in chunks, so that only one chunk of the file is held in memory at a time.
+
+        Args:
+            file_path: Path to the CSV file.
+            chunksize: Maximum number of rows per chunk.
+            predicate: Optional function that receives a chunk and returns a boolean mask of the rows to keep.
+            **kwargs: Remaining args are passed to `pd.read_csv`.
+
+        Returns: Iterator of DataFrames.
+
+        """
+        with cls.load(file_path, chunksize=chunksize, **kwargs) as reader:
+            for chunk in reader:
+                if predicate is not None:
+                    chunk = chunk[predicate(chunk)]
+                yield chunk
+
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
+        if 'columns' in kwargs:
+            kwargs['usecols'] = kwargs.pop('columns')
+        if kwargs.get('engine') == 'pyarrow':
+            try:
+                import pyarrow.csv
+            except ImportError:
+                warnings.warn('pyarrow is not installed, loading {} with the default CSV engine'.format(file_path),
+                              RuntimeWarning)
+                kwargs.pop('engine')
+                return pd.read_csv(file_path, **kwargs)
+            if len(kwargs) == 1:
+                # read directly with pyarrow, converting column by column so the arrow table is freed as it goes
+                table = pyarrow.csv.read_csv(file_path, read_options=pyarrow.csv.ReadOptions(use_threads=True))
+                return table.to_pandas(split_blocks=True, self_destruct=True)
+            # pandas translates the other read_csv arguments to pyarrow options
         return pd.read_csv(file_path, **kwargs)
 
 
 class ExcelDataInterface(DataInterfaceBase):
+    """
+    Save and load Excel files with pandas. If no `engine` is given, the fastest installed engine is used: loads use
+     `calamine` (python-calamine) when installed, and saves use `xlsxwriter` when installed. Otherwise pandas falls back
+     to `openpyxl`, which it already opens in read-only mode for loading.
+    """
 
     file_extension = 'xlsx'
+    # pandas added the calamine engine in 2.2
+    pandas_supports_calamine = _get_major_minor_version(pd.__version__) >= (2, 2)
 
     @classmethod
     def _interface_specific_save(cls, data, file_path, mode=None, **kwargs):
+        if 'engine' not in kwargs and _module_is_installed('xlsxwriter'):
+            kwargs['engine'] = 'xlsxwriter'
         data.to_excel(file_path, **kwargs)
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
+        if 'engine' not in kwargs and cls.pandas_supports_calamine and _module_is_installed('python_calamine'):
+            kwargs['engine'] = 'calamine'
         return pd.read_excel(file_path, **kwargs)
 
 
 class ParquetDataInterface(DataInterfaceBase):
+    """
+    Save and load Parquet files with pandas. Parquet is the recommended format for saving DataFrames: files are
+     compact, fast to load, and support loading a subset of `columns` or rows (`filters`).
+
+    When saving with pyarrow, files are compressed with zstd by default, which makes them considerably smaller than
+     with pyarrow's default snappy compression at a similar decompression speed. Pass `compression` and
+     `row_group_size` to save to override.
+    """
 
     file_extension = 'parquet'
+    # only applied when pandas uses pyarrow, as the other engines don't accept them
+    pyarrow_save_defaults = MappingProxyType({'compression': 'zstd', 'compression_level': 3})
+    # coalesce the reads of neighbouring column chunks into fewer, larger reads, which matters most on network storage
+    pyarrow_load_defaults = MappingProxyType({'pre_buffer': True})
 
     @classmethod
     def _interface_specific_save(cls, data, file_path, mode=None, **kwargs):
+        if cls._uses_pyarrow(kwargs.get('engine', 'auto')) and 'compression' not in kwargs:
+            # the default compression_level only applies to the default compression, other codecs may not accept it
+            kwargs = {**cls.pyarrow_save_defaults, **kwargs}
         try:
             data.to_parquet(file_path, **kwargs)
         except ImportError as import_error:
@@ -133,6 +520,8 @@ class ParquetDataInterface(DataInterfaceBase):
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
+        if cls._uses_pyarrow(kwargs.get('engine', 'auto')):
+            kwargs = {**cls.pyarrow_load_defaults, **kwargs}
         try:
             data = pd.read_parquet(file_path, **kwargs)
         except ImportError as import_error:
@@ -140,14 +529,104 @@ class ParquetDataInterface(DataInterfaceBase):
                               '\n{}'.format(import_error))
         return data
 
+    @classmethod
+    def load_chunks(cls, file_path: str, chunksize: int = 65536, columns: List[str] = None
+                    ) -> Iterator[pd.DataFrame]:
+        """
+        Load a Parquet file in chunks, so that only one chunk of the file is decoded and held in memory at a time.
+         Requires pyarrow.
+
+        Args:
+            file_path: Path to the Parquet file.
+            chunksize: Maximum number of rows per chunk.
+            columns: Optional, the columns to load.
+
+        Returns: Iterator of DataFrames.
+
+        """
+        parquet_file = cls._open_parquet_file(file_path)
+        for batch in parquet_file.iter_batches(batch_size=chunksize, columns=columns, use_pandas_metadata=True):
+            yield batch.to_pandas()
+
+    @classmethod
+    def load_row_group(cls, file_path: str, row_group: int, columns: List[str] = None) -> pd.DataFrame:
+        """
+        Load a single row group of a Parquet file. Requires pyarrow.
+
+        Args:
+            file_path: Path to the Parquet file.
+            row_group: Index of the row group to load.
+            columns: Optional, the columns to load.
+
+        Returns: DataFrame of the rows in the row group.
+
+        """
+        parquet_file = cls._open_parquet_file(file_path)
+        return parquet_file.read_row_group(row_group, columns=columns, use_pandas_metadata=True).to_pandas()
+
+    @staticmethod
+    def _open_parquet_file(file_path: str):
+        try:
+            import pyarrow.parquet
+        except ImportError as import_error:
+            raise ImportError('Loading Parquet files in parts requires pyarrow to be installed.'
+                              '\n{}'.format(import_error))
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(file_path)
+        return pyarrow.parquet.ParquetFile(file_path, **ParquetDataInterface.pyarrow_load_defaults)
+
+    @staticmethod
+    def _uses_pyarrow(engine: str) -> bool:
+        """Whether pandas will use pyarrow for the given parquet engine argument. pandas' 'auto' prefers pyarrow."""
+        if engine == 'pyarrow':
+            return True
+        if engine == 'auto':
+            return _module_is_installed('pyarrow')
+        return False
+
+
+class FeatherDataInterface(DataInterfaceBase):
+    """
+    Save and load DataFrames as Feather (Arrow IPC) files with pyarrow. Feather stores the columns in Arrow's in-memory
+     format, so saving and loading are much faster than pickling a DataFrame, and files are memory-mapped on load.
+     Files are compressed with lz4 by default. Only DataFrames can be saved as Feather; save other objects as pickles.
+    """
+
+    file_extension = 'feather'
+    default_save_kwargs = MappingProxyType({'compression': 'lz4'})
+    default_load_kwargs = MappingProxyType({'memory_map': True})
+
+    @classmethod
+    def _interface_specific_save(cls, data, file_path, mode=None, **kwargs):
+        if not isinstance(data, pd.DataFrame):
+            raise TypeError('Only DataFrames can be saved as Feather files, received {}. '
+                            'Save other objects with the pkl file extension instead.'.format(type(data).__name__))
+        feather = cls._import_feather()
+        feather.write_feather(data, file_path, **kwargs)
+
+    @classmethod
+    def _interface_specific_load(cls, file_path, **kwargs):
+        feather = cls._import_feather()
+        return feather.read_feather(file_path, **kwargs)
+
+    @staticmethod
+    def _import_feather():
+        try:
+            import pyarrow.feather
+        except ImportError as import_error:
+            raise ImportError('Feather files require pyarrow to be installed separately.'
+                              '\n{}'.format(import_error))
+        return pyarrow.feather
+
 
 class PDFDataInterface(DataInterfaceBase):
 
     file_extension = 'pdf'
+    default_save_kwargs = MappingProxyType({'garbage': 4, 'deflate': True, 'clean': True})
 
     @classmethod
     def _interface_specific_save(cls, doc, file_path, mode=None, **kwargs):
-        doc.save(file_path, garbage=4, deflate=True, clean=True, **kwargs)
+        doc.save(file_path, **kwargs)
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
@@ -161,13 +640,17 @@ class YAMLDataInterface(DataInterfaceBase):
 
     @classmethod
     def _interface_specific_save(cls, data, file_path, mode='w', **kwargs):
-        with open(file_path, mode, **kwargs) as f:
-            yaml.dump(data, f, default_flow_style=False)
+        if mode == 'w' and len(kwargs) == 0:
+            yaml_str = yaml.dump(data, Dumper=YAMLDumper, default_flow_style=False)
+            cls._write_bytes(file_path, yaml_str.encode(TEXT_ENCODING, TEXT_ENCODING_ERRORS))
+            return
+        with open(file_path, mode, **{**TEXT_OPEN_KWARGS, **kwargs}) as f:
+            yaml.dump(data, f, Dumper=YAMLDumper, default_flow_style=False)
 
     @classmethod
     def _interface_specific_load(cls, file_path, **kwargs):
-        with open(file_path, 'r', **kwargs) as f:
-            data = yaml.safe_load(f)
+        with open(file_path, 'r', **{**TEXT_OPEN_KWARGS, **kwargs}) as f:
+            data = yaml.load(f, Loader=YAMLSafeLoader)
         return data
 
 
@@ -175,6 +658,7 @@ class TestingDataInterface(DataInterfaceBase):
     """Test class that doesn't make interactions with the file system, for use in unit tests"""
 
     file_extension = 'test'
+    atomic_save = False
 
     @classmethod
     def _interface_specific_save(cls, data, file_path, mode='wb+', **kwargs) -> None:
@@ -189,6 +673,8 @@ class MagicDataInterfaceBase:
 
     def __init__(self):
         self.registered_interfaces = {}
+        # data interfaces are stateless, so selections can be remembered until the registry changes
+        self._selection_cache = {}
 
     def save(self, data: Any, file_path: str, mode: str = None, **kwargs) -> str:
         file_dir_path = os.path.dirname(file_path)
@@ -205,53 +691,109 @@ class MagicDataInterfaceBase:
         print('Loading {}'.format(file_path))
         return data_interface.load(file_path, **kwargs)
 
-    def register_data_interface(self, data_interface: Type[DataInterfaceBase]) -> None:
-        self.registered_interfaces[data_interface.file_extension] = data_interface
+    def load_many(self, file_paths: List[str], max_workers: int = None, **kwargs) -> List[Any]:
+        """
+        Load many files concurrently, on a pool of threads. Loading is mostly spent waiting on the disk or in
+         decompression and parsing code that releases the GIL, so loading many files in parallel is faster than one
+         after another.
+
+        Args:
+            file_paths: Paths of the files to load. The data interface for each file is selected by its file extension.
+            max_workers: Maximum number of threads to use. Defaults to the ThreadPoolExecutor default.
+            **kwargs: Remaining args are passed to the data interface load function of every file.
+
+        Returns: List of the loaded data, in the same order as file_paths.
 
-    def select_data_interface(self, file_hint: str, default_file_type=None) -> DataInterfaceBase:
+        """
+        data_interfaces = [self.select_data_interface(file_path) for file_path in file_paths]
+
+        def load_file(data_interface: Type[DataInterfaceBase], file_path: str) -> Any:
+            file_kwargs = kwargs
+            if data_interface is ParquetDataInterface and data_interface._uses_pyarrow(kwargs.get('engine', 'auto')):
+                # files are already loaded in parallel, don't also have each load start its own threads
+                file_kwargs = {'use_threads': False, **kwargs}
+            print('Loading {}'.format(file_path))
+            return data_interface.load(file_path, **file_kwargs)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(load_file, data_interfaces, file_paths))
+
+    def register_data_interface(self, data_interface: Type[DataInterfaceBase], file_extension: str = None) -> None:
+        """
+        Register a data interface to be used for files of its file extension.
+
+        Args:
+            data_interface: The DataInterface to register.
+            file_extension: Optional, an additional file extension to register the interface for. Defaults to the
+                data interface's own file_extension.
+        """
+        if file_extension is None:
+            file_extension = data_interface.file_extension
+        # file hints are matched case-insensitively
+        self.registered_interfaces[file_extension.lower()] = data_interface
+        self._selection_cache.clear()
+
+    def select_data_interface(self, file_hint: str, default_file_type=None) -> Type[DataInterfaceBase]:
         """
         Select the appropriate data interface based on the file_hint.
 
         Args:
             file_hint: May be a file name with an extension, or just a file extension.
             default_file_type: default file type to use, if the file_hint doesn't specify.
-        Returns: A DataInterface.
+        Returns: A DataInterface class.
         """
-        file_hint = self._parse_file_hint(file_hint)
-        if file_hint in self.registered_interfaces:
-            return self._instantiate_data_interface(file_hint)
-        elif default_file_type is not None:
-            return self._instantiate_data_interface(default_file_type)
-        else:
+        file_type = self._parse_file_hint(file_hint)
+        # cache on the parsed file type rather than the raw hint, which is often a full file path
+        cache_key = (file_type, default_file_type)
+        data_interface = self._selection_cache.get(cache_key)
+        if data_interface is None:
+            data_interface = self._select_data_interface(file_type, default_file_type)
+            self._selection_cache[cache_key] = data_interface
+        return data_interface
+
+    def _select_data_interface(self, file_type: str, default_file_type=None) -> Type[DataInterfaceBase]:
+        # all data interface methods are classmethods, so the class itself is returned rather than an instance
+        data_interface = self.registered_interfaces.get(file_type)
+        if data_interface is None and default_file_type is not None:
+            data_interface = self.registered_interfaces.get(default_file_type.lower())
+        if data_interface is None:
             raise ValueError("File hint {} not recognized. Supported file types include {}".format(
-                file_hint, list(self.registered_interfaces.keys())))
-
-    def _instantiate_data_interface(self, file_type: str) -> DataInterfaceBase:
-        if file_type in self.registered_interfaces:
-            return self.registered_interfaces[file_type]()
-        else:
-            raise ValueError("File type {} not recognized. Supported file types include {}".format(
-                file_type, list(self.registered_interfaces.keys())))
-
-    @staticmethod
-    def _parse_file_hint(file_hint: str) -> str:
-        if type(file_hint) is PosixPath:
-            file_hint = file_hint.__str__()
-        if '.' in file_hint:
-            file_name, file_extension = file_hint.split('.')
-            return file_extension
+                file_type if default_file_type is None else default_file_type, list(self.registered_interfaces.keys())))
+        return data_interface
+
+    def _parse_file_hint(self, file_hint: str) -> str:
+        if isinstance(file_hint, PurePath):
+            file_hint = str(file_hint)
+        root, ext = os.path.splitext(file_hint)
+        if ext != '':
+            ext = ext[1:].lower()
+            if ext in COMPRESSION_EXTENSIONS:
+                # a compressed file is selected by both of its extensions, as in 'csv.gz'
+                inner_root, inner_ext = os.path.splitext(root)
+                if inner_ext != '':
+                    return '{}.{}'.format(inner_ext[1:].lower(), ext)
+                # a bare compressed file extension, like 'pkl.zst', as opposed to a compressed file without an inner
+                # extension, like 'data.gz'
+                bare_file_type = '{}.{}'.format(os.path.basename(root).lstrip('.').lower(), ext)
+                if bare_file_type in self.registered_interfaces:
+                    return bare_file_type
+            return ext
         else:
-            return file_hint
+            # a bare file extension, possibly with a leading '.'
+            return file_hint.lstrip('.').lower()
 
 
 all_live_interfaces = [
     PickleDataInterface,
+    ZstdPickleDataInterface,
     DillDataInterface,
     CSVDataInterface,
     ParquetDataInterface,
+    FeatherDataInterface,
     ExcelDataInterface,
     TextDataInterface,
     TextDataInterface,
+    ZstdTextDataInterface,
     PDFDataInterface,
     YAMLDataInterface,
 ]
@@ -259,6 +801,11 @@ all_live_interfaces = [
 MagicDataInterface = MagicDataInterfaceBase()
 for interface in all_live_interfaces:
     MagicDataInterface.register_data_interface(interface)
+MagicDataInterface.register_data_interface(ParquetDataInterface, 'pq')
+MagicDataInterface.register_data_interface(FeatherDataInterface, 'arrow')
+# pandas decompresses CSV files based on their extension
+for compression_extension in COMPRESSION_EXTENSIONS:
+    MagicDataInterface.register_data_interface(CSVDataInterface, 'csv.{}'.format(compression_extension))
 
 TestMagicDataInterface = MagicDataInterfaceBase()
 TestMagicDataInterface.register_data_interface(TestingDataInterface)
@@ -1,3 +1,4 @@
+import os
 import warnings
 from .data_directory import DataDirectory, DataDirectoryManager
 from typing import Type
@@ -23,15 +24,15 @@ class DataManager:
             data_dir_manager: DataDirectoryManager to use to interact with registered DataDirectories
         """
         self.data_path = data_dir_manager.load_project_path_from_hint(path_hint)
-        self.data_directory = DataDirectory(self.data_path.__str__())
+        self.data_directory = DataDirectory(os.fspath(self.data_path))
         warnings.warn('DataManager is deprecated. Please use `DataDirectory.load()` instead.', DeprecationWarning,
                       stacklevel=2)
 
     def reload(self):
         """Refresh the data directory contents that `DataManager` is aware of.
         Useful if you have created a new file on the file system without using `DataManager`, and now need `DataManager`
-        to know about it. """
-        self.data_directory = DataDirectory(self.data_path)
+        to know about it. Files and directories that were already known are kept rather than re-created. """
+        self.data_directory.refresh()
 
     def __getitem__(self, key):
         return self.data_directory[key]
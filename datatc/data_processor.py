@@ -1,18 +1,31 @@
-import glob
-import inspect
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import os
-from pathlib import Path
-from typing import Any, Callable
+from typing import Any, Callable, Dict, List, Optional
 
 import datatc.data_interface as di
+from datatc.self_aware_data import DirCache, get_func_source
 
 
 class DataProcessor:
 
-    def __init__(self, data, processor_func, code):
+    __slots__ = ('data_set', 'processor_func', 'code', '_processor_func_loader', '_code_loader')
+
+    def __init__(self, data, processor_func=None, code=None, processor_func_loader: Callable[[], Callable] = None,
+                 code_loader: Callable[[], str] = None):
+        """
+        Args:
+            data: The processed data.
+            processor_func: The function that generated the data.
+            code: The source code of processor_func.
+            processor_func_loader: Used in place of processor_func, to defer loading the function until it is used.
+            code_loader: Used in place of code, to defer loading the source code until it is viewed.
+        """
         self.data_set = data
         self.processor_func = processor_func
         self.code = code
+        self._processor_func_loader = processor_func_loader
+        self._code_loader = code_loader
 
     @property
     def data(self):
@@ -20,12 +33,18 @@ class DataProcessor:
 
     @property
     def func(self):
+        if self._processor_func_loader is not None:
+            self.processor_func = self._processor_func_loader()
+            self._processor_func_loader = None
         return self.processor_func
 
     def rerun(self, *args, **kwargs):
-        return self.processor_func(*args, **kwargs)
+        return self.func(*args, **kwargs)
 
     def view_code(self):
+        if self._code_loader is not None:
+            self.code = self._code_loader()
+            self._code_loader = None
         return self.code
 
 
@@ -36,17 +55,41 @@ class DataProcessorCacheManager:
         self.processor_data_interface = di.DillDataInterface
         self.code_designation = '_code'
         self.code_data_interface = di.TextDataInterface
+        # listing of the cached data processors in each directory, until the directory changes
+        self._listing_cache = DirCache()
 
     def save(self, data: Any, processing_func: Callable, file_name: str, data_file_type: str, file_dir_path: str):
-        if self.check_name_already_exists(file_name, file_dir_path):
+        # claim the name by exclusively creating the processor file, which fails atomically if the name is taken
+        processor_file_path = self._get_processor_file_path(file_name, file_dir_path)
+        try:
+            os.close(os.open(processor_file_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644))
+        except FileExistsError:
             raise ValueError("That data processor name is already in use")
 
-        data_interface = di.MagicDataInterface.select(data_file_type)
+        try:
+            self._save_files(data, processing_func, file_name, data_file_type, file_dir_path)
+        except BaseException:
+            # release the name
+            os.remove(processor_file_path)
+            raise
+
+    def _save_files(self, data: Any, processing_func: Callable, file_name: str, data_file_type: str,
+                    file_dir_path: str) -> None:
+        data_interface = di.MagicDataInterface.select_data_interface(data_file_type)
+        # read the source before running the processor, so that a function whose source can't be found fails fast
+        processing_func_code = get_func_source(processing_func)
         data = processing_func(data)
-        data_interface.save(data, file_name, file_dir_path)
-        self.processor_data_interface.save(processing_func, file_name + self.processor_designation, file_dir_path)
-        processing_func_code = inspect.getsource(processing_func)
-        self.code_data_interface.save(processing_func_code, file_name + self.code_designation, file_dir_path)
+        # the three files are independent, so write them concurrently
+        with ThreadPoolExecutor(max_workers=3) as executor:
+            futures = [
+                executor.submit(data_interface.save, data, file_name, file_dir_path),
+                executor.submit(self.processor_data_interface.save, processing_func,
+                                file_name + self.processor_designation, file_dir_path, prefer_pickle=True),
+                executor.submit(self.code_data_interface.save, processing_func_code,
+                                file_name + self.code_designation, file_dir_path),
+            ]
+        for future in futures:
+            future.result()
 
     def load(self, file_name: str, file_dir_path: str) -> DataProcessor:
         """
@@ -56,51 +99,94 @@ class DataProcessorCacheManager:
             file_name: The base name of the data file. May include the file extension, otherwise the file extension
                 will be deduced.
             file_dir_path: the path to the directory where cached data processors are stored.
-        Returns: Tuple(data, processing_func)
+        Returns: DataProcessor. The processing function and its code are only loaded when first used.
         """
         data_file_extension = None
-        if '.' in file_name:
-            file_name, data_file_extension = file_name.split('.')
+        base_name, dot, extension = file_name.partition('.')
+        if dot != '':
+            file_name, data_file_extension = base_name, extension
 
-        # load the processor
-        processing_func = self.processor_data_interface.load(file_name + self.processor_designation, file_dir_path)
+        def load_processing_func():
+            return self.processor_data_interface.load(self._get_processor_file_path(file_name, file_dir_path))
 
-        # load the data
-        code = self.code_data_interface.load(file_name + self.code_designation, file_dir_path)
+        def load_code():
+            return self.code_data_interface.load(
+                self.code_data_interface.construct_file_path(file_name + self.code_designation, file_dir_path))
 
         # find and load the data
         if data_file_extension is None:
+            data_file_extension = self.list_cached_data_processors(file_dir_path).get(file_name)
+        if data_file_extension is None:
+            # raises an informative error about the missing or ambiguous data file
             data_file_extension = self.get_data_processor_data_type(file_name, file_dir_path)
-        data_interface = di.MagicDataInterface.select(data_file_extension)
-        data = data_interface.load(file_name, file_dir_path)
-        return DataProcessor(data, processing_func, code)
+        data_interface = di.MagicDataInterface.select_data_interface(data_file_extension)
+        data = data_interface.load(os.path.join(file_dir_path, '{}.{}'.format(file_name, data_file_extension)))
+        return DataProcessor(data, processor_func_loader=load_processing_func, code_loader=load_code)
 
     def check_name_already_exists(self, file_name, file_dir_path):
-        existing_data_processors = self.list_cached_data_processors(file_dir_path)
-        if file_name in existing_data_processors:
-            return True
-        else:
-            return False
+        # a single stat of the processor file, rather than listing the whole directory
+        return os.path.isfile(self._get_processor_file_path(file_name, file_dir_path))
+
+    def _get_processor_file_path(self, file_name: str, file_dir_path: str) -> str:
+        return self.processor_data_interface.construct_file_path(file_name + self.processor_designation,
+                                                                 file_dir_path)
 
     @staticmethod
     def get_data_processor_data_type(file_name, file_dir_path):
-        data_path = Path("{}/{}.*".format(file_dir_path, file_name))
-        processor_files = glob.glob(data_path.__str__())
+        prefix = file_name + '.'
+        processor_file_names = [name for name in DataProcessorCacheManager._list_file_names(file_dir_path)
+                                if name.startswith(prefix)]
 
-        if len(processor_files) == 0:
+        if len(processor_file_names) == 0:
             raise ValueError("No data file found for processor {}".format(file_name))
-        elif len(processor_files) > 1:
+        elif len(processor_file_names) > 1:
+            processor_files = [os.path.join(file_dir_path, name) for name in processor_file_names]
             raise ValueError("Something went wrong- there's more than one file that matches this processor name: "
                              "{}".format("\n - ".join(processor_files)))
 
-        data_file = processor_files[0]
-        data_file_extension = os.path.basename(data_file).split('.')[1]
+        data_file_extension = processor_file_names[0].partition('.')[2]
         return data_file_extension
 
-    def list_cached_data_processors(self, file_dir_path: str):
-        # glob for all processor files
-        processors_path = Path("{}/*{}.{}".format(file_dir_path, self.processor_designation,
-                                                  self.processor_data_interface.file_extension))
-        processor_files = glob.glob(processors_path.__str__())
-        processor_names = [os.path.basename(file).split('.')[0] for file in processor_files]
-        return processor_names
+    def list_cached_data_processors(self, file_dir_path: str) -> Dict[str, Optional[str]]:
+        """
+        List the data processors cached in a directory, along with the file extension of each one's data file, from a
+         single read of the directory.
+
+        Args:
+            file_dir_path: the path to the directory where cached data processors are stored.
+
+        Returns: Dict of processor name to the file extension of its data file, or to None if there is not exactly one
+            data file for the processor.
+
+        """
+        processors = self._listing_cache.get(file_dir_path, partial(self._list_cached_data_processors, file_dir_path))
+        return dict(processors)
+
+    def _list_cached_data_processors(self, file_dir_path: str) -> Dict[str, Optional[str]]:
+        suffix = '{}.{}'.format(self.processor_designation, self.processor_data_interface.file_extension)
+        processor_names = []
+        data_file_extensions = {}
+        for file_name in self._list_file_names(file_dir_path):
+            if file_name.endswith(suffix) and len(file_name) > len(suffix):
+                processor_names.append(file_name[:-len(suffix)])
+            else:
+                base_name, dot, extension = file_name.partition('.')
+                if dot != '':
+                    data_file_extensions.setdefault(base_name, []).append(extension)
+
+        processors = {}
+        for processor_name in processor_names:
+            extensions = data_file_extensions.get(processor_name, [])
+            processors[processor_name] = extensions[0] if len(extensions) == 1 else None
+        return processors
+
+    @staticmethod
+    def _list_file_names(file_dir_path: str) -> List[str]:
+        """List the names of the non-hidden files in a directory with a single directory read, without a stat call
+         per file."""
+        try:
+            with os.scandir(file_dir_path) as entries:
+                return [entry.name for entry in entries
+                        if not entry.name.startswith('.') and entry.is_file()]
+        except FileNotFoundError:
+            return []
@@ -1,9 +1,13 @@
+from functools import lru_cache
 import git
 from git import Repo
+from git.refs import SymbolicReference
 import inspect
 import os
-import subprocess
-from typing import Callable
+from typing import Callable, FrozenSet, List, Optional, Tuple
+
+# length of the abbreviated commit hashes recorded by datatc, git's default minimum abbreviation length
+SHORT_GIT_HASH_LENGTH = 7
 
 
 def get_git_repo_of_func(func: Callable) -> str:
@@ -23,8 +27,8 @@ def get_git_repo_of_func(func: Callable) -> str:
     """
     file_path = get_file_where_func_defined(func)
     if os.path.exists(file_path):
-        if check_if_path_is_in_git_repo(file_path):
-            repo = Repo(file_path, search_parent_directories=True)
+        repo = get_git_repo(file_path)
+        if repo is not None:
             return repo.working_tree_dir
     return None
 
@@ -33,24 +37,159 @@ def get_file_where_func_defined(func: Callable) -> str:
     return os.path.abspath(inspect.getfile(func))
 
 
-def check_if_path_is_in_git_repo(path: str) -> bool:
+def get_git_repo(path: str) -> Optional[Repo]:
+    """
+    Get a handle on the git repo that contains path. Handles are cached per repo, so that repeated lookups don't
+     re-create the Repo (which runs git) each time. Paths outside of a git repo are not cached, so that a repo created
+     there later is found.
+
+    Args:
+        path: Path to a directory or file within a git repo. Does not need to be the top level repo directory.
+
+    Returns: The git Repo, or None if path is not in a git repo.
+
+    """
+    working_tree_dir = _find_git_working_tree_dir(path)
     try:
-        _ = Repo(path, search_parent_directories=True)
-    except git.exc.InvalidGitRepositoryError:
-        return False
-    return True
+        if working_tree_dir is not None:
+            return _open_git_repo(working_tree_dir)
+        # not in a regular working tree, but git may still find a repo, for example through GIT_DIR
+        return Repo(path, search_parent_directories=True)
+    except (git.exc.InvalidGitRepositoryError, git.exc.NoSuchPathError):
+        return None
+
+
+@lru_cache(maxsize=16)
+def _open_git_repo(working_tree_dir: str) -> Repo:
+    # raises rather than returning None, so that failures aren't cached
+    return Repo(working_tree_dir)
+
+
+def _find_git_working_tree_dir(path: str) -> Optional[str]:
+    """Find the top level directory of the git working tree containing path, by looking for .git in path and its
+     parents."""
+    dir_path = os.path.realpath(path)
+    if not os.path.isdir(dir_path):
+        if not os.path.exists(dir_path):
+            return None
+        dir_path = os.path.dirname(dir_path)
+    while True:
+        if os.path.exists(os.path.join(dir_path, '.git')):
+            return dir_path
+        parent_dir_path = os.path.dirname(dir_path)
+        if parent_dir_path == dir_path:
+            return None
+        dir_path = parent_dir_path
+
+
+def check_if_path_is_in_git_repo(path: str) -> bool:
+    return get_git_repo(path) is not None
 
 
 def get_git_hash_from_path(dir_path: str) -> str:
     """
     Get the short hash of latest git commit.
+    The commit is resolved by reading HEAD and the ref it points to, without running git.
         path (str): Path to directory within a git repo. Does not need to be the top level repo directory.
     Returns:
         git_hash (str): Short hash of latest commit on the active branch of the git repo.
     """
-    git_hash_raw = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=dir_path)
-    git_hash = git_hash_raw.strip().decode("utf-8")
-    return git_hash
+    repo = get_git_repo(dir_path)
+    if repo is None:
+        raise git.exc.InvalidGitRepositoryError(dir_path)
+    return _get_head_sha(repo)[:SHORT_GIT_HASH_LENGTH]
+
+
+def _get_head_sha(repo: Repo) -> str:
+    """
+    Get the full hash of the commit that HEAD points to, by reading HEAD and the branch ref it points to. Neither git
+     nor gitpython's object database is used, so no git process is started.
+
+    Args:
+        repo: The git Repo.
+
+    Returns: The commit hash.
+
+    """
+    head = _read_git_file(os.path.join(repo.git_dir, 'HEAD'))
+    if head is not None and not head.startswith('ref: '):
+        # a detached HEAD contains the commit hash itself
+        return head
+    if head is not None:
+        ref = _read_git_file(os.path.join(repo.common_dir, head[len('ref: '):]))
+        if ref is not None and not ref.startswith('ref: '):
+            return ref
+    # the ref has been packed into packed-refs, or is itself symbolic: let gitpython resolve it, which also only reads
+    # the ref files, and raises ValueError if the ref doesn't exist yet
+    return SymbolicReference.dereference_recursive(repo, 'HEAD')
+
+
+def _read_git_file(file_path: str) -> Optional[str]:
+    try:
+        with open(file_path, 'r') as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def _get_gitignore_matcher(repo_dir: str) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """
+    Get the filenames and file extensions listed in the repo's .gitignore. The .gitignore is only re-parsed when it
+     changes.
+
+    Args:
+        repo_dir: The git working tree directory.
+
+    Returns: A set of ignored filenames, and a tuple of ignored extensions (which can be passed straight to
+     `str.endswith`).
+
+    """
+    gitignore_path = os.path.join(repo_dir, '.gitignore')
+    try:
+        gitignore_stat = os.stat(gitignore_path)
+    except OSError:
+        return frozenset(), ()
+    return _parse_gitignore(gitignore_path, gitignore_stat.st_mtime_ns, gitignore_stat.st_size)
+
+
+@lru_cache(maxsize=32)
+def _parse_gitignore(gitignore_path: str, mtime_ns: int, size: int) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    try:
+        with open(gitignore_path, 'r') as f:
+            # one read of the whole file, rather than a readline per line
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    gitignore = [line.strip() for line in lines if line != '' and not line.startswith('#')]
+
+    gitignore_files = frozenset(item for item in gitignore if not item.startswith('*'))
+    gitignore_ext = tuple(item.strip('*') for item in gitignore if item.startswith('*'))
+    return gitignore_files, gitignore_ext
+
+
+def _get_changed_tracked_files(repo: Repo) -> List[str]:
+    """
+    List the tracked files that have uncommitted changes, staged or not, using git's own status check rather than
+     diffing the index against the working tree in python.
+
+    Args:
+        repo: The git Repo.
+
+    Returns: List of paths relative to the working tree directory.
+
+    """
+    # -z gives one unquoted path per NUL-terminated entry; renames and copies are followed by an extra entry holding
+    # the original path
+    status_entries = iter(repo.git.status('--porcelain', '-z', untracked_files='no').split('\0'))
+    changed_files = []
+    for entry in status_entries:
+        if len(entry) < 4:
+            continue
+        status, changed_file = entry[:2], entry[3:]
+        changed_files.append(changed_file)
+        if 'R' in status or 'C' in status:
+            next(status_entries, None)
+    return changed_files
 
 
 def check_for_uncommitted_git_changes_at_path(repo_path: str) -> bool:
@@ -62,24 +201,22 @@ def check_for_uncommitted_git_changes_at_path(repo_path: str) -> bool:
         False: no uncommitted changes found, Repo is valid.
         True: uncommitted changes found. Repo is not valid.
     """
-    repo = Repo(repo_path, search_parent_directories=True)
-
-    try:
-        # get list of gitignore filenames and extensions as these wouldn't have been code synced over
-        # and therefore would appears as if they were uncommitted changes
-        with open(os.path.join(repo.working_tree_dir, '.gitignore'), 'r') as f:
-            gitignore = [line.strip() for line in f.readlines() if not line.startswith('#') and line != '\n']
-    except FileNotFoundError:
-        gitignore = []
+    repo = get_git_repo(repo_path)
+    if repo is None:
+        raise git.exc.InvalidGitRepositoryError(repo_path)
 
-    gitignore_files = [item for item in gitignore if not item.startswith('*')]
-    gitignore_ext = [item.strip('*') for item in gitignore if item.startswith('*')]
+    # gitignore filenames and extensions wouldn't have been code synced over
+    # and therefore would appears as if they were uncommitted changes
+    gitignore_files, gitignore_ext = _get_gitignore_matcher(repo.working_tree_dir)
 
     # get list of changed files, but ignore ones in gitignore (either by filename match or extension match)
-    changed_files = [item.a_path for item in repo.index.diff(None)
-                     if os.path.basename(item.a_path) not in gitignore_files]
-    changed_files = [item for item in changed_files
-                     if not any([item.endswith(ext) for ext in gitignore_ext])]
+    changed_files = []
+    for changed_file in _get_changed_tracked_files(repo):
+        if os.path.basename(changed_file) in gitignore_files:
+            continue
+        if changed_file.endswith(gitignore_ext):
+            continue
+        changed_files.append(changed_file)
 
     if len(changed_files) > 0:
         raise RuntimeError('There are uncommitted changes in files: {}'
@@ -1,34 +1,171 @@
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from copy import deepcopy
-import datetime
-import glob
+from functools import lru_cache, partial
 import inspect
 import os
 import shutil
 from pathlib import Path
+import threading
+import time
 from typing import Any, Callable, Dict, List, Tuple, Type, Union
 
 from .data_interface import MagicDataInterface, DillDataInterface, TextDataInterface, YAMLDataInterface
 from .git_utilities import get_git_repo_of_func, check_for_uncommitted_git_changes_at_path, get_git_hash_from_path
 
 
+# file systems with coarse timestamps (FAT has a resolution of 2 seconds) give changes made within the same tick the
+# same modification time, so a directory that changed this recently may still change without its key changing
+DIR_CACHE_SETTLE_TIME_NS = 2 * 10 ** 9
+
+
+def get_dir_cache_key(path) -> Union[Tuple[str, int, int, int], None]:
+    """
+    Build a key for caching information about a directory's files. The key includes the directory's modification time,
+     which changes whenever a file is added, removed, or renamed within the directory. Its change time and link count
+     are included too, which catch a modification time that was set back.
+
+    A directory modified within the last `DIR_CACHE_SETTLE_TIME_NS` could change again without its modification time
+     changing, so no key is built for it until it has settled.
+
+    Args:
+        path: Path to a directory.
+
+    Returns: Tuple of (path, modification time in ns, change time in ns, link count), or None if the directory can't
+     be stat'ed or has changed too recently to be cached.
+
+    """
+    try:
+        dir_stat = os.stat(path)
+    except OSError:
+        return None
+    # once settled, any further change gives the directory a new modification time, different from the one in the key
+    if dir_stat.st_mtime_ns > time.time_ns() - DIR_CACHE_SETTLE_TIME_NS:
+        return None
+    return str(path), dir_stat.st_mtime_ns, dir_stat.st_ctime_ns, dir_stat.st_nlink
+
+
+class DirCache:
+    """
+    Cache information about directories until they change. Only the entry for a directory's latest modification time
+     is kept, and the least recently used directories are evicted once there are more than `max_size`.
+    """
+
+    def __init__(self, max_size: int = 1024):
+        self.max_size = max_size
+        # (namespace, path) to (get_dir_cache_key of the path, cached value), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path, compute: Callable[[], Any], namespace: Any = None) -> Any:
+        """
+        Get the cached value for a directory, computing and caching it if the directory has changed since.
+
+        Args:
+            path: Path to a directory.
+            compute: Function that computes the value for the directory.
+            namespace: Separates the values of different kinds of information cached for the same directory.
+
+        Returns: The value for the directory.
+
+        """
+        dir_cache_key = get_dir_cache_key(path)
+        if dir_cache_key is None:
+            return compute()
+        entry_key = (namespace, str(path))
+        with self._lock:
+            entry = self._entries.get(entry_key)
+            if entry is not None and entry[0] == dir_cache_key:
+                self._entries.move_to_end(entry_key)
+                return entry[1]
+
+        value = compute()
+        with self._lock:
+            # replaces any entry for an older modification time
+            self._entries[entry_key] = (dir_cache_key, value)
+            self._entries.move_to_end(entry_key)
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        return value
+
+
+# (file name, first line number, qualified name, source file modification time and size) of a function definition to its
+# source code, least recently used first
+_func_source_cache = OrderedDict()
+_func_source_cache_lock = threading.Lock()
+FUNC_SOURCE_CACHE_SIZE = 256
+
+
+def get_func_source(func: Callable) -> str:
+    """
+    Get the source code of a function, like `inspect.getsource`. Reading and tokenizing the source file is only done
+     once per function definition: the source is cached by where the function is defined, until its source file changes.
+
+    Args:
+        func: A function.
+
+    Returns: The source code of the function.
+
+    """
+    func = inspect.unwrap(func)
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return inspect.getsource(func)
+
+    try:
+        source_file_stat = os.stat(code.co_filename)
+    except OSError:
+        # defined somewhere other than a file, such as an interactive session, so there's nothing to invalidate on
+        return inspect.getsource(func)
+    # code objects themselves are not a safe cache key: code objects from different files, or that only differ in
+    # their comments, compare equal
+    cache_key = (code.co_filename, code.co_firstlineno, func.__qualname__, source_file_stat.st_mtime_ns,
+                 source_file_stat.st_size)
+    with _func_source_cache_lock:
+        source = _func_source_cache.get(cache_key)
+        if source is not None:
+            _func_source_cache.move_to_end(cache_key)
+            return source
+
+    source = inspect.getsource(func)
+    with _func_source_cache_lock:
+        _func_source_cache[cache_key] = source
+        if len(_func_source_cache) > FUNC_SOURCE_CACHE_SIZE:
+            _func_source_cache.popitem(last=False)
+    return source
+
+
 class SADTimestamp:
 
+    timestamp_format = '%Y-%m-%d_%H-%M-%S'
+
     @classmethod
     def now(cls):
-        return datetime.datetime.now().strftime('%Y-%m-%d_%H-%M-%S')
+        # time.strftime formats the local time directly, without building a datetime object first
+        return time.strftime(cls.timestamp_format)
 
     @classmethod
     def format(cls, timestamp):
-        date, time = timestamp.split('_')
-        hours, minutes, seconds = time.split('-')
+        date, time_of_day = timestamp.split('_')
+        hours, minutes, seconds = time_of_day.split('-')
         return '{} {}:{}'.format(date, hours, minutes)
 
 
 class TransformStepBase:
 
-    def __init__(self, **kwargs):
+    __slots__ = ('metadata',)
+
+    def __init__(self):
         self.metadata = {}
 
+    def __setstate__(self, state):
+        # steps pickled before __slots__ was added carry their attributes in a dict, rather than in slot state
+        if isinstance(state, tuple):
+            dict_state, slot_state = state
+            state = {**(dict_state or {}), **slot_state}
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def get_info(self) -> Dict:
         raise NotImplementedError
 
@@ -41,6 +178,8 @@ class TransformStepBase:
 
 class LiveTransformStep(TransformStepBase):
 
+    __slots__ = ('transformer_func',)
+
     def __init__(self, metadata: Dict, transformer_func: Callable):
         """
         Track a data transformation step.
@@ -93,7 +232,8 @@ class LiveTransformStep(TransformStepBase):
         if self.tag is not None and self.tag != '':
             print(self.tag)
         print("-" * 80)
-        print(self.code)
+        if self.code is not None:
+            print(self.code)
         if self.kwargs is not None and len(self.kwargs) > 0:
             print()
             for kw in self.kwargs:
@@ -106,6 +246,8 @@ class LiveTransformStep(TransformStepBase):
 
 class StaticTransformStep(TransformStepBase):
 
+    __slots__ = ()
+
     def __init__(self, metadata: Dict):
         """
         Track a data transformation step.
@@ -154,7 +296,8 @@ class StaticTransformStep(TransformStepBase):
         if self.tag is not None and self.tag != '':
             print(self.tag)
         print("-" * 80)
-        print(self.code)
+        if self.code is not None:
+            print(self.code)
         if self.kwargs is not None and len(self.kwargs) > 0:
             print()
             for kw in self.kwargs:
@@ -167,6 +310,7 @@ class StaticTransformStep(TransformStepBase):
 
 class FileBasedTransformStep(TransformStepBase):
 
+    __slots__ = ('file_path',)
     step_name = 'File'
 
     def __init__(self, file_path: str):
@@ -198,16 +342,19 @@ class FileBasedTransformStep(TransformStepBase):
 
 class SourceFileTransformStep(FileBasedTransformStep):
 
+    __slots__ = ()
     step_name = 'Source file'
 
 
 class FileSourceTransformStep(FileBasedTransformStep):
     """exists only for backwards compatibility"""
+    __slots__ = ()
     step_name = 'Source file'
 
 
 class IntermediateFileTransformStep(FileBasedTransformStep):
 
+    __slots__ = ()
     step_name = 'Intermediate file'
 
 
@@ -215,8 +362,8 @@ class TransformStepInterface:
 
     @classmethod
     def execute(cls, data: Any, transformer_func: Callable, tag: str = '', enforce_clean_git: bool = True,
-                get_git_hash_from: Any = None, **kwargs) -> Union[Any, TransformStepBase]:
-        code = inspect.getsource(transformer_func)
+                get_git_hash_from: Any = None, capture_source: bool = True, **kwargs) -> Union[Any, TransformStepBase]:
+        code = get_func_source(transformer_func) if capture_source else None
         git_hash = cls.get_git_hash(transformer_func, get_git_hash_from, enforce_clean_git)
         metadata = {
             'timestamp': SADTimestamp.format(SADTimestamp.now()),
@@ -295,18 +442,18 @@ TransformSequenceConvertible = Union['TransformSequence', List[TransformStepBase
 class TransformSequence:
 
     def __init__(self, sequence: TransformSequenceConvertible = None):
-        if type(sequence) == TransformSequence:
+        if isinstance(sequence, TransformSequence):
             self.sequence = sequence.sequence
         elif sequence is None:
             self.sequence = []
-        elif type(sequence) is list:
+        elif isinstance(sequence, list):
             if len(sequence) == 0:
                 self.sequence = []
             else:
                 first_element = sequence[0]
-                if issubclass(type(first_element), TransformStepBase):
+                if isinstance(first_element, TransformStepBase):
                     self.sequence = sequence
-                elif type(first_element) is dict:
+                elif isinstance(first_element, dict):
                     self.sequence = self.build_from_metadata(sequence)
                 else:
                     raise ValueError('Sequence not recognized. Must be list of TransformStepInterface or List of dict,'
@@ -317,15 +464,35 @@ class TransformSequence:
     def append(self, transform_step: TransformStepBase):
         self.sequence.append(transform_step)
 
-    def rerun(self, data: Any) -> Any:
-        live_steps = [step for step in self.sequence if type(step) == LiveTransformStep]
+    def extend(self, transform_step: TransformStepBase) -> 'TransformSequence':
+        """
+        Create a new TransformSequence with an additional step, leaving this one unchanged.
+        The steps are shared with this sequence rather than copied; steps are not modified after they are created, so
+         their metadata must be treated as read-only.
+
+        Args:
+            transform_step: The step to add.
+
+        Returns: A new TransformSequence.
+
+        """
+        return self._from_steps(self.sequence + [transform_step])
+
+    @classmethod
+    def _from_steps(cls, steps: List[TransformStepBase]) -> 'TransformSequence':
+        """Create a TransformSequence from a list of steps that is already known to be valid, skipping validation."""
+        transform_sequence = cls.__new__(cls)
+        transform_sequence.sequence = steps
+        return transform_sequence
+
+    def rerun(self, data: Any, copy: bool = False) -> Any:
+        live_steps = [step for step in self.sequence if isinstance(step, LiveTransformStep)]
         if len(live_steps) == 0:
             raise RuntimeError('This TransformSequence contains no re-runable steps.')
 
-        transformed_data = deepcopy(data)
+        transformed_data = deepcopy(data) if copy else data
         for step in live_steps:
-            if type(step) == LiveTransformStep:
-                transformed_data = step.rerun(transformed_data)
+            transformed_data = step.rerun(transformed_data)
         return transformed_data
 
     def is_not_empty(self) -> bool:
@@ -339,11 +506,7 @@ class TransformSequence:
 
     @classmethod
     def build_from_metadata(cls, metadata: List[Dict]) -> List[TransformStepBase]:
-        sequence = []
-        for entry in metadata:
-            step = TransformStepInterface.load(**entry)
-            sequence.append(step)
-        return sequence
+        return [TransformStepInterface.load(**entry) for entry in metadata]
 
     def print_steps(self):
         for i, step in enumerate(self.sequence):
@@ -377,7 +540,7 @@ class SelfAwareData:
         return self.transform_sequence.get_info()
 
     def transform(self, transformer_func: Callable, tag: str = '', enforce_clean_git=True,
-                  get_git_hash_from: Any = None, **kwargs) -> 'SelfAwareData':
+                  get_git_hash_from: Any = None, capture_source: bool = True, **kwargs) -> 'SelfAwareData':
         """
         Transform a SelfAwareData, generating a new SelfAwareData object.
 
@@ -388,32 +551,36 @@ class SelfAwareData:
                 clean.
             get_git_hash_from: Locally installed module from which to get git information. Use this arg if
                 transform_func is defined outside of a module tracked by git.
+            capture_source: Whether to record the source code of transformer_func. Reading the source can be skipped
+                for exploratory work where the code does not need to be kept.
 
         Returns: new transform directory name, for adding to contents dict.
         """
         transformed_data, transform_step = TransformStepInterface.execute(self.data, transformer_func, tag,
                                                                           enforce_clean_git=enforce_clean_git,
-                                                                          get_git_hash_from=get_git_hash_from, **kwargs)
+                                                                          get_git_hash_from=get_git_hash_from,
+                                                                          capture_source=capture_source, **kwargs)
         new_sad = self._copy_and_extend(transformed_data, transform_step)
         return new_sad
 
     def _copy_and_extend(self, transformed_data, transform_step) -> 'SelfAwareData':
         """Generate a new SAD object from the existing one, adding an additional step"""
-        new_sad = SelfAwareData(transformed_data, deepcopy(self.transform_sequence))
-        new_sad.transform_sequence.append(transform_step)
-        return new_sad
+        return SelfAwareData(transformed_data, self.transform_sequence.extend(transform_step))
 
-    def rerun(self, data) -> Any:
+    def rerun(self, data, copy: bool = False) -> Any:
         """
         Rerun the same transformation function that generated this `SelfAwareData` on a new data object.
 
         Args:
             data:
+            copy: Whether to deep copy data before rerunning the transformation steps on it. As with `transform`, data
+                is passed straight to the first transformation function by default, so only set this if a
+                transformation function modifies its input in place.
 
         Returns:
 
         """
-        return self.transform_sequence.rerun(data)
+        return self.transform_sequence.rerun(data, copy=copy)
 
     def print_steps(self):
         """Print the code of the transformation steps that generated the data."""
@@ -451,6 +618,8 @@ class VersionedSelfAwareDataInterface:
 
     version = None
     file_component_interfaces = {}
+    # file maps of SAD directories, namespaced by version
+    _sub_files_cache = DirCache()
 
     @classmethod
     def save(cls, sad: SelfAwareData, parent_path: str, file_name: str,  **kwargs) -> Path:
@@ -476,22 +645,51 @@ class VersionedSelfAwareDataInterface:
     def _generate_name_for_transform_dir(cls, git_hash: str, tag: str = None) -> str:
         raise NotImplementedError
 
-    @classmethod
-    def _parse_transform_dir_name(cls, path) -> Tuple[str, str, str]:
+    @staticmethod
+    def _save_concurrently(save_calls: List[Callable[[], Any]]) -> None:
+        """
+        Run the saves of the independent files of a SAD directory concurrently, on a thread pool. Saving is mostly
+         spent in file writes and compression that release the GIL, so the saves overlap rather than adding up.
+
+        Args:
+            save_calls: Functions that each save one file.
+
+        Raises: The first error raised by a save, once all saves have finished.
+
+        """
+        with ThreadPoolExecutor(max_workers=len(save_calls)) as executor:
+            futures = [executor.submit(save_call) for save_call in save_calls]
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def _parse_transform_dir_name(path) -> Tuple[str, str, str]:
         raise NotImplementedError
 
     @classmethod
     def _identify_transform_sub_files(cls, path: str) -> Dict[str, str]:
-        glob_path = Path(path, '*')
-        subpaths = glob.glob(glob_path.__str__())
+        file_map = cls._sub_files_cache.get(path, partial(cls._find_transform_sub_files, path), namespace=cls.version)
+        return dict(file_map)
+
+    @classmethod
+    def _find_transform_sub_files(cls, path: str) -> Dict[str, str]:
+        # index the sub files by name stem once, rather than scanning all of them for each file component
+        subpaths_by_stem = {}
+        with os.scandir(path) as entries:
+            for entry in entries:
+                # skip hidden files, such as the temporary files of saves in progress
+                if entry.name.startswith('.'):
+                    continue
+                stem = entry.name.split('.', 1)[0]
+                subpaths_by_stem.setdefault(stem, []).append(entry.path)
         file_map = {}
         for file_component in cls.file_component_interfaces:
-            file_map[file_component] = cls._identify_sub_file(subpaths, file_component)
+            file_map[file_component] = cls._identify_sub_file(subpaths_by_stem, file_component)
         return file_map
 
     @classmethod
-    def _identify_sub_file(cls, file_contents: List[Path], key: str) -> str:
-        options = [str(file_path) for file_path in file_contents if key in os.path.basename(file_path)]
+    def _identify_sub_file(cls, subpaths_by_stem: Dict[str, List[str]], key: str) -> str:
+        options = subpaths_by_stem.get(key, [])
         if len(options) == 0:
             raise ValueError('No {} file found for SelfAwareData'.format(key))
         elif len(options) > 1:
@@ -528,7 +726,8 @@ class SelfAwareDataInterface_v0(VersionedSelfAwareDataInterface):
         info = sad.get_info()
         if len(info) > 0:
             git_hash = info[-1].get('git_hash', '')
-            code = info[-1].get('code', '')
+            # the code is None when it was not captured
+            code = info[-1].get('code') or ''
             latest_transform_step = sad.transform_sequence.sequence[-1]
             if type(latest_transform_step) == LiveTransformStep:
                 transformer_func = latest_transform_step.transformer_func
@@ -544,9 +743,12 @@ class SelfAwareDataInterface_v0(VersionedSelfAwareDataInterface):
 
         try:
             data_interface = MagicDataInterface.select_data_interface(data_file_type)
-            data_interface.save(sad.data, 'data', new_transform_dir_path, **kwargs)
-            cls.file_component_interfaces['func'].save(transformer_func, 'func', new_transform_dir_path)
-            cls.file_component_interfaces['code'].save(code, 'code', new_transform_dir_path)
+            cls._save_concurrently([
+                partial(data_interface.save, sad.data, 'data', new_transform_dir_path, **kwargs),
+                partial(cls.file_component_interfaces['func'].save, transformer_func, 'func', new_transform_dir_path,
+                        prefer_pickle=True),
+                partial(cls.file_component_interfaces['code'].save, code, 'code', new_transform_dir_path),
+            ])
         except Exception:
             # clean up the failed SAD dir before raising the error
             shutil.rmtree(new_transform_dir_path)
@@ -622,8 +824,9 @@ class SelfAwareDataInterface_v0(VersionedSelfAwareDataInterface):
             file_name_components.append(tag)
         return delimiter_char.join(file_name_components)
 
-    @classmethod
-    def _parse_transform_dir_name(cls, path) -> Tuple[str, str, str]:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_transform_dir_name(path) -> Tuple[str, str, str]:
         delimiter_char = '__'
         dir_name = os.path.basename(path)
         dir_name_components = dir_name.split(delimiter_char)
@@ -668,15 +871,16 @@ class SelfAwareDataInterface_v1(VersionedSelfAwareDataInterface):
 
         try:
             data_interface = MagicDataInterface.select_data_interface(data_file_type)
-            data_interface.save(sad.data, 'data', new_transform_dir_path, **kwargs)
-
-            cls.file_component_interfaces['sad'].save(sad, 'sad', new_transform_dir_path)
-
             provenance = {
                 'interface_version': cls.version,
                 'transform_steps': sad.get_info()
             }
-            cls.file_component_interfaces['provenance'].save(provenance, 'provenance', new_transform_dir_path)
+            cls._save_concurrently([
+                partial(data_interface.save, sad.data, 'data', new_transform_dir_path, **kwargs),
+                partial(cls.file_component_interfaces['sad'].save, sad, 'sad', new_transform_dir_path),
+                partial(cls.file_component_interfaces['provenance'].save, provenance, 'provenance',
+                        new_transform_dir_path),
+            ])
         except Exception:
             # clean up the failed SAD dir before raising the error
             shutil.rmtree(new_transform_dir_path)
@@ -750,8 +954,9 @@ class SelfAwareDataInterface_v1(VersionedSelfAwareDataInterface):
             file_name_components.append(tag)
         return delimiter_char.join(file_name_components)
 
-    @classmethod
-    def _parse_transform_dir_name(cls, path) -> Tuple[str, str]:
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _parse_transform_dir_name(path) -> Tuple[str, str]:
         delimiter_char = '__'
         dir_name = os.path.basename(path)
         dir_name_components = dir_name.split(delimiter_char)
@@ -770,6 +975,8 @@ class SADInterfaceVersionManagerBase:
     def __init__(self):
         self.version_map = {}
         self.latest_version = None
+        # interface versions of SAD directories
+        self._path_version_cache = DirCache()
 
     def register(self, interface: Type[VersionedSelfAwareDataInterface]):
         version = interface.version
@@ -779,7 +986,7 @@ class SADInterfaceVersionManagerBase:
         self._update_latest_version(version)
 
     def select_version_for_path(self, file_path: str) -> VersionedSelfAwareDataInterface:
-        version = self.read_version_from_metadata_file(file_path)
+        version = self._path_version_cache.get(file_path, partial(self.read_version_from_metadata_file, file_path))
         if version not in self.version_map:
             known_versions = list(self.version_map.keys())
             raise RuntimeError('SAD Interface version not recognized: {}. Known versions: {}'.format(version,
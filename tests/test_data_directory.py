@@ -1,14 +1,140 @@
+from concurrent.futures import ThreadPoolExecutor
+import io
+import os
+import shutil
+import tempfile
 import unittest
+from unittest import mock
 import warnings
 import pytest
+from datatc import data_directory
 from datatc.data_directory import DataDirectory, DataFile
-from datatc.data_interface import TestMagicDataInterface
+from datatc.data_interface import MagicDataInterface, TestMagicDataInterface
 
 
 # suppress 'DataDirectory path does not exist' warnings
 @pytest.mark.filterwarnings('ignore')
 class TestDataDirectory(unittest.TestCase):
 
+    # === CHARACTERIZE DIR ===
+
+    def test_characterize_dir_skips_hidden_and_ignored(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            os.makedirs(os.path.join(test_dir, 'subdir'))
+            os.makedirs(os.path.join(test_dir, '__pycache__'))
+            open(os.path.join(test_dir, 'file1.txt'), 'w').close()
+            open(os.path.join(test_dir, '.hidden'), 'w').close()
+            contents = DataDirectory._characterize_dir(test_dir)
+            self.assertEqual(set(contents.keys()), {'subdir', 'file1.txt'})
+            self.assertEqual(type(contents['file1.txt']), DataFile)
+            self.assertEqual(type(contents['subdir']), DataDirectory)
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_characterize_dir_many_subdirs(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            subdir_names = {'subdir_{}'.format(i) for i in range(40)}
+            for subdir_name in subdir_names:
+                os.makedirs(os.path.join(test_dir, subdir_name))
+            contents = DataDirectory._characterize_dir(test_dir)
+            self.assertEqual(set(contents.keys()), subdir_names)
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_characterize_dir_does_not_stat_children(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            for i in range(50):
+                open(os.path.join(test_dir, 'file_{}.csv'.format(i)), 'w').close()
+            for i in range(5):
+                os.makedirs(os.path.join(test_dir, 'subdir_{}'.format(i)))
+            data_dir = DataDirectory(test_dir)
+            with mock.patch('os.stat', wraps=os.stat) as stat_spy, mock.patch('os.lstat', wraps=os.lstat) as lstat_spy:
+                contents = DataDirectory._characterize_dir(data_dir.path)
+            self.assertEqual(len(contents), 55)
+            self.assertEqual(contents['file_0.csv'].path, data_dir.path / 'file_0.csv')
+            self.assertEqual(stat_spy.call_count, 0)
+            self.assertEqual(lstat_spy.call_count, 0)
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_characterize_executor_created_once(self):
+        original_executor = data_directory._characterize_executor
+        data_directory._characterize_executor = None
+        try:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                executors = list(executor.map(lambda _: data_directory._get_characterize_executor(), range(32)))
+            self.assertEqual(len({id(executor) for executor in executors}), 1)
+            executors[0].shutdown()
+        finally:
+            data_directory._characterize_executor = original_executor
+
+    def test_characterize_dir_missing_path_is_empty(self):
+        self.assertEqual(DataDirectory._characterize_dir('does_not_exist'), {})
+
+    def test_contents_characterized_on_first_access(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            data_dir = DataDirectory(test_dir)
+            open(os.path.join(test_dir, 'file1.txt'), 'w').close()
+            self.assertEqual(list(data_dir.contents.keys()), ['file1.txt'])
+            self.assertEqual(data_dir.data_type, 'txt')
+
+            open(os.path.join(test_dir, 'file2.csv'), 'w').close()
+            data_dir.reload()
+            self.assertEqual(set(data_dir.contents.keys()), {'file1.txt', 'file2.csv'})
+            self.assertEqual(data_dir.data_type, 'mixed')
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_refresh_picks_up_changes_and_keeps_unchanged_items(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            os.mkdir(os.path.join(test_dir, 'subdir'))
+            open(os.path.join(test_dir, 'file1.txt'), 'w').close()
+            data_dir = DataDirectory(test_dir)
+            file1 = data_dir['file1.txt']
+            subdir = data_dir['subdir']
+            self.assertEqual(subdir.contents, {})
+
+            open(os.path.join(test_dir, 'subdir', 'file2.csv'), 'w').close()
+            open(os.path.join(test_dir, 'file3.txt'), 'w').close()
+            os.remove(os.path.join(test_dir, 'file1.txt'))
+            data_dir.refresh()
+
+            self.assertEqual(set(data_dir.contents.keys()), {'subdir', 'file3.txt'})
+            self.assertIs(data_dir['subdir'], subdir)
+            self.assertEqual(list(subdir.contents.keys()), ['file2.csv'])
+            self.assertNotIn(file1, data_dir.contents.values())
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_refresh_picks_up_changes_with_unchanged_mtime(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            open(os.path.join(test_dir, 'file1.txt'), 'w').close()
+            data_dir = DataDirectory(test_dir)
+            dir_mtime_ns = os.stat(test_dir).st_mtime_ns
+            self.assertEqual(list(data_dir.contents.keys()), ['file1.txt'])
+
+            # as on a file system with coarse timestamps, the directory changes but keeps its modification time
+            open(os.path.join(test_dir, 'file2.txt'), 'w').close()
+            os.utime(test_dir, ns=(dir_mtime_ns, dir_mtime_ns))
+            data_dir.refresh()
+            self.assertEqual(set(data_dir.contents.keys()), {'file1.txt', 'file2.txt'})
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_compressed_file_data_type(self):
+        self.assertEqual(DataFile(path='file1.csv.gz').data_type, 'csv.gz')
+        self.assertEqual(DataFile(path='file1.gz').data_type, 'gz')
+        self.assertEqual(DataFile(path='pkl.zst').data_type, 'pkl.zst')
+        # file types agree with the file hints of the data interfaces
+        for file_name in ['file1.csv.gz', 'file1.gz', 'pkl.zst']:
+            self.assertEqual(DataFile(path=file_name).data_type, MagicDataInterface._parse_file_hint(file_name))
+
     # === LS ===
 
     def test_ls_one_file(self):
@@ -100,6 +226,14 @@ class TestDataDirectory(unittest.TestCase):
         ]}
         self.assertEqual(top_dir._build_ls_tree(), expected_result)
 
+    def test_print_ls_tree(self):
+        file1 = DataFile(path='file1.txt', contents={})
+        subdir = DataDirectory(path='subdir', contents={'file1.txt': file1})
+        data_dir = DataDirectory('top', contents={'subdir': subdir})
+        out = io.StringIO()
+        data_dir._print_ls_tree(data_dir._build_ls_tree(full=True), out=out)
+        self.assertEqual(out.getvalue(), 'top/\n    subdir/\n        file1.txt\n')
+
     # === SELECT ===
     def test_select_hint_one_exact_match_one_fuzzy_match(self):
         sql_file = DataFile(path='query.sql', contents={})
@@ -115,6 +249,12 @@ class TestDataDirectory(unittest.TestCase):
         hint = 'sq'
         self.assertRaises(ValueError, data_dir.select, hint)
 
+    def test_select_hint_exact_name_among_fuzzy_matches(self):
+        csv_file = DataFile(path='data.csv', contents={})
+        backup_file = DataFile(path='data.csv.bak', contents={})
+        data_dir = DataDirectory('top', contents={'data.csv': csv_file, 'data.csv.bak': backup_file})
+        self.assertEqual(data_dir.select('data.csv'), csv_file)
+
     # === LATEST ===
 
     def test_latest_year_month_day_comparison(self):
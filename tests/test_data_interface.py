@@ -1,8 +1,16 @@
+import importlib.util
+import os
+import pickle
+import stat
 import unittest
+from unittest import mock
+import pytest
 import tempfile
 import pandas as pd
 import shutil
-from datatc.data_interface import MagicDataInterface, TestingDataInterface
+from datatc.data_interface import MagicDataInterface, TestingDataInterface, CSVDataInterface, DillDataInterface, \
+    FeatherDataInterface, ParquetDataInterface, PickleDataInterface, ZstdPickleDataInterface, ZstdTextDataInterface, \
+    _get_major_minor_version
 
 
 class TestDataInterface(unittest.TestCase):
@@ -31,13 +39,266 @@ class TestDataInterface(unittest.TestCase):
         self.assertEqual(TestingDataInterface.construct_file_path(file_name, file_dir_path), expected_result)
 
     def test_data_interface_save(self):
-        p = self.test_dir + 'test_save.csv'
+        p = os.path.join(self.test_dir, 'test_save.csv')
         MagicDataInterface.save(self.raw_df, p, index=False)
         reloaded_data = pd.read_csv(p)
         pd.testing.assert_frame_equal(self.raw_df, reloaded_data)
 
     def test_data_interface_load(self):
-        p = self.test_dir + 'test_load.csv'
+        p = os.path.join(self.test_dir, 'test_load.csv')
         self.raw_df.to_csv(p, index=False)
         reloaded_data = MagicDataInterface.load(p)
         pd.testing.assert_frame_equal(self.raw_df, reloaded_data)
+
+    def test_pickle_save_and_load(self):
+        p = os.path.join(self.test_dir, 'test_pickle.pkl')
+        MagicDataInterface.save(self.raw_df, p)
+        reloaded_data = MagicDataInterface.load(p)
+        pd.testing.assert_frame_equal(self.raw_df, reloaded_data)
+
+    def test_select_data_interface_file_name_with_multiple_dots(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('data.v2.csv'), CSVDataInterface)
+
+    def test_select_data_interface_extension_with_leading_dot(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('.csv'), CSVDataInterface)
+
+    def test_select_data_interface_default_file_type(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('data', default_file_type='csv'), CSVDataInterface)
+
+    def test_select_data_interface_unrecognized_file_type(self):
+        with self.assertRaises(ValueError):
+            MagicDataInterface.select_data_interface('data.unknown')
+        with self.assertRaises(ValueError):
+            MagicDataInterface.select_data_interface('data', default_file_type='unknown')
+
+    def test_select_data_interface_upper_case_extension(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('DATA.CSV'), CSVDataInterface)
+        self.assertEqual(MagicDataInterface.select_data_interface('Pkl'), PickleDataInterface)
+
+    def test_select_data_interface_compressed_file(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('data.csv.gz'), CSVDataInterface)
+        self.assertEqual(MagicDataInterface.select_data_interface('data.v2.pkl.zst'), ZstdPickleDataInterface)
+        self.assertEqual(MagicDataInterface.select_data_interface('pkl.zst'), ZstdPickleDataInterface)
+
+    def test_parse_file_hint_bare_compression_extension(self):
+        # a compressed file without an inner extension is typed by its compression extension alone, as DataFile does
+        self.assertEqual(MagicDataInterface._parse_file_hint('data.gz'), 'gz')
+        self.assertEqual(MagicDataInterface._parse_file_hint('dir/data.gz'), 'gz')
+        self.assertEqual(MagicDataInterface._parse_file_hint('.gz'), 'gz')
+        self.assertEqual(MagicDataInterface._parse_file_hint('pkl.zst'), 'pkl.zst')
+        with self.assertRaises(ValueError):
+            MagicDataInterface.select_data_interface('data.gz')
+
+    def test_zstd_text_save_rejects_append(self):
+        with self.assertRaises(ValueError):
+            ZstdTextDataInterface.save('text', 'test_zstd_text', self.test_dir, mode='a')
+
+    def test_get_major_minor_version(self):
+        self.assertEqual(_get_major_minor_version('2.2.1'), (2, 2))
+        self.assertEqual(_get_major_minor_version('2.2.0rc0'), (2, 2))
+        self.assertEqual(_get_major_minor_version('3.0.0.dev0+1234.gabcdef'), (3, 0))
+        self.assertEqual(_get_major_minor_version('unknown'), (0, 0))
+
+    def test_compressed_csv_save_and_load(self):
+        p = os.path.join(self.test_dir, 'test_compressed.csv.gz')
+        MagicDataInterface.save(self.raw_df, p, index=False)
+        with open(p, 'rb') as f:
+            self.assertEqual(f.read(2), b'\x1f\x8b')
+        pd.testing.assert_frame_equal(MagicDataInterface.load(p), self.raw_df)
+
+    def test_zstd_pickle_save_and_load(self):
+        pytest.importorskip('zstandard')
+        p = os.path.join(self.test_dir, 'test_zstd')
+        saved_path = ZstdPickleDataInterface.save(self.raw_df, 'test_zstd', self.test_dir)
+        self.assertEqual(saved_path, p + '.pkl.zst')
+        pd.testing.assert_frame_equal(MagicDataInterface.load(saved_path), self.raw_df)
+
+    def test_select_data_interface_parquet_short_extension(self):
+        self.assertEqual(MagicDataInterface.select_data_interface('data.pq'), ParquetDataInterface)
+
+    def test_dill_save_and_load_uses_highest_protocol(self):
+        saved_path = MagicDataInterface.save(lambda x: x * 2, os.path.join(self.test_dir, 'test_dill.dill'))
+        with open(saved_path, 'rb') as f:
+            # binary pickles start with the PROTO opcode followed by the protocol number
+            self.assertEqual(f.read(2), bytes([0x80, pickle.HIGHEST_PROTOCOL]))
+        self.assertEqual(MagicDataInterface.load(saved_path)(3), 6)
+
+    def test_dill_prefer_pickle_writes_importable_functions_with_pickle(self):
+        saved_path = DillDataInterface.save(os.path.join, 'test_func', self.test_dir, prefer_pickle=True)
+        with open(saved_path, 'rb') as f:
+            self.assertIs(pickle.load(f), os.path.join)
+        self.assertIs(DillDataInterface.load(saved_path), os.path.join)
+
+    def test_dill_prefer_pickle_falls_back_to_dill(self):
+        saved_path = DillDataInterface.save(lambda x: x * 2, 'test_lambda', self.test_dir, prefer_pickle=True)
+        self.assertEqual(DillDataInterface.load(saved_path)(3), 6)
+
+    def test_optimized_pickle_save_and_load(self):
+        data = {'key_{}'.format(i): [i, str(i)] for i in range(1000)}
+        plain_path = PickleDataInterface.save(data, 'plain', self.test_dir)
+        optimized_path = PickleDataInterface.save(data, 'optimized', self.test_dir, optimize=True)
+        self.assertLess(os.path.getsize(optimized_path), os.path.getsize(plain_path))
+        self.assertEqual(PickleDataInterface.load(optimized_path), data)
+
+    def test_text_save_and_load(self):
+        p = os.path.join(self.test_dir, 'test_text.txt')
+        text = 'def f(x):\n    return x * 2\n'
+        MagicDataInterface.save(text, p)
+        self.assertEqual(MagicDataInterface.load(p), text)
+
+    def test_default_kwargs_can_be_overridden(self):
+        class KwargsDataInterface(TestingDataInterface):
+            default_load_kwargs = {'a': 1, 'b': 2}
+
+            @classmethod
+            def _interface_specific_load(cls, file_path, **kwargs):
+                return kwargs
+
+        p = os.path.join(self.test_dir, 'test_kwargs.test')
+        open(p, 'w').close()
+        self.assertEqual(KwargsDataInterface.load(p, b=3), {'a': 1, 'b': 3})
+
+    def test_feather_save_and_load(self):
+        pytest.importorskip('pyarrow')
+        p = os.path.join(self.test_dir, 'test_feather.feather')
+        MagicDataInterface.save(self.raw_df, p)
+        pd.testing.assert_frame_equal(MagicDataInterface.load(p), self.raw_df)
+
+    def test_feather_save_rejects_non_dataframes(self):
+        with self.assertRaises(TypeError):
+            FeatherDataInterface.save({'not': 'a dataframe'}, 'test_feather', self.test_dir)
+        self.assertEqual(os.listdir(self.test_dir), [])
+
+    def test_failed_save_keeps_existing_file(self):
+        p = os.path.join(self.test_dir, 'test_atomic.csv')
+        MagicDataInterface.save(self.raw_df, p, index=False)
+        with self.assertRaises(AttributeError):
+            # not a DataFrame, so the csv save fails
+            MagicDataInterface.save({'not': 'a dataframe'}, p)
+        self.assertEqual(os.listdir(self.test_dir), ['test_atomic.csv'])
+        pd.testing.assert_frame_equal(MagicDataInterface.load(p), self.raw_df)
+
+    def test_yaml_save_and_load(self):
+        p = os.path.join(self.test_dir, 'test_yaml.yaml')
+        data = {'interface_version': 1, 'transform_steps': [{'tag': 'step_1', 'kwargs': {'factor': 2}}]}
+        MagicDataInterface.save(data, p)
+        self.assertEqual(MagicDataInterface.load(p), data)
+
+    def test_text_round_trips_undecodable_bytes(self):
+        p = os.path.join(self.test_dir, 'test_latin1.txt')
+        raw_bytes = 'café\n'.encode('latin-1')
+        with open(p, 'wb') as f:
+            f.write(raw_bytes)
+        text = MagicDataInterface.load(p)
+        MagicDataInterface.save(text, p)
+        with open(p, 'rb') as f:
+            self.assertEqual(f.read(), raw_bytes)
+
+    def test_pickle_save_and_load_out_of_band_buffers(self):
+        p = os.path.join(self.test_dir, 'test_pickle_oob.pkl')
+        MagicDataInterface.save(self.raw_df, p, out_of_band_buffers=True)
+        with open(p, 'rb') as f:
+            self.assertTrue(f.read().startswith(PickleDataInterface.out_of_band_magic))
+        reloaded_data = MagicDataInterface.load(p)
+        pd.testing.assert_frame_equal(self.raw_df, reloaded_data)
+        # reloaded arrays are backed by writeable buffers
+        reloaded_data.loc[0, 'col_1'] = -1
+
+    def test_pickle_load_truncated_out_of_band_file(self):
+        p = os.path.join(self.test_dir, 'test_pickle_oob.pkl')
+        MagicDataInterface.save(self.raw_df, p, out_of_band_buffers=True)
+        with open(p, 'rb') as f:
+            raw_bytes = f.read()
+        header_length = len(PickleDataInterface.out_of_band_magic)
+        # cut off within the lengths, the buffer lengths, the pickle, and the buffers
+        for truncated_length in [header_length + 8, header_length + 20, header_length + 40, len(raw_bytes) - 1]:
+            truncated_p = os.path.join(self.test_dir, 'test_pickle_oob_{}.pkl'.format(truncated_length))
+            with open(truncated_p, 'wb') as f:
+                f.write(raw_bytes[:truncated_length])
+            with self.assertRaisesRegex(EOFError, truncated_p):
+                MagicDataInterface.load(truncated_p)
+
+    def test_csv_load_pyarrow_engine(self):
+        p = os.path.join(self.test_dir, 'test_load_pyarrow.csv')
+        self.raw_df.to_csv(p, index=False)
+        reloaded_data = MagicDataInterface.load(p, engine='pyarrow')
+        pd.testing.assert_frame_equal(self.raw_df, reloaded_data)
+
+    def test_csv_load_chunks(self):
+        p = os.path.join(self.test_dir, 'test_load_chunks.csv')
+        self.raw_df.to_csv(p, index=False)
+        chunks = list(CSVDataInterface.load_chunks(p, chunksize=20, predicate=lambda df: df['col_1'] % 2 == 0))
+        self.assertEqual(len(chunks), 3)
+        expected_df = self.raw_df[self.raw_df['col_1'] % 2 == 0]
+        pd.testing.assert_frame_equal(pd.concat(chunks), expected_df)
+
+    def test_csv_load_columns(self):
+        p = os.path.join(self.test_dir, 'test_load_columns.csv')
+        self.raw_df.to_csv(p, index=False)
+        reloaded_data = MagicDataInterface.load(p, columns=['col_2'])
+        pd.testing.assert_frame_equal(self.raw_df[['col_2']], reloaded_data)
+
+    def test_parquet_save_and_load(self):
+        pytest.importorskip('pyarrow')
+        import pyarrow.parquet
+        p = os.path.join(self.test_dir, 'test_parquet.parquet')
+        MagicDataInterface.save(self.raw_df, p)
+        self.assertEqual(pyarrow.parquet.ParquetFile(p).metadata.row_group(0).column(0).compression, 'ZSTD')
+        reloaded_data = MagicDataInterface.load(p, columns=['col_2'])
+        pd.testing.assert_frame_equal(self.raw_df[['col_2']], reloaded_data)
+
+    def test_parquet_save_with_compression_override(self):
+        pytest.importorskip('pyarrow')
+        import pyarrow.parquet
+        for compression, expected_codec in [('snappy', 'SNAPPY'), (None, 'UNCOMPRESSED')]:
+            p = os.path.join(self.test_dir, 'test_parquet_{}.parquet'.format(compression))
+            MagicDataInterface.save(self.raw_df, p, compression=compression)
+            self.assertEqual(pyarrow.parquet.ParquetFile(p).metadata.row_group(0).column(0).compression,
+                             expected_codec)
+            pd.testing.assert_frame_equal(MagicDataInterface.load(p), self.raw_df)
+
+    def test_parquet_engine_check_is_cached(self):
+        pytest.importorskip('pyarrow')
+        self.assertTrue(ParquetDataInterface._uses_pyarrow('auto'))
+        with mock.patch('importlib.util.find_spec', wraps=importlib.util.find_spec) as find_spec_spy:
+            for _ in range(3):
+                self.assertTrue(ParquetDataInterface._uses_pyarrow('auto'))
+        self.assertEqual(find_spec_spy.call_count, 0)
+
+    def test_parquet_load_chunks(self):
+        pytest.importorskip('pyarrow')
+        p = os.path.join(self.test_dir, 'test_parquet_chunks.parquet')
+        MagicDataInterface.save(self.raw_df, p)
+        chunks = list(ParquetDataInterface.load_chunks(p, chunksize=20))
+        self.assertEqual(len(chunks), 3)
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), self.raw_df)
+        pd.testing.assert_frame_equal(ParquetDataInterface.load_row_group(p, 0), self.raw_df)
+
+    def test_load_with_cache(self):
+        p = os.path.join(self.test_dir, 'test_load_cache.csv')
+        self.raw_df.to_csv(p, index=False)
+        first_load = MagicDataInterface.load(p, cache=True)
+        self.assertIs(MagicDataInterface.load(p, cache=True), first_load)
+        self.assertIsNot(MagicDataInterface.load(p), first_load)
+        # cache can only be passed by keyword, so a stray second positional argument isn't taken for it
+        with self.assertRaises(TypeError):
+            CSVDataInterface.load(p, self.test_dir)
+
+        # a changed file is loaded again
+        self.raw_df.head(10).to_csv(p, index=False)
+        self.assertEqual(len(MagicDataInterface.load(p, cache=True)), 10)
+
+    def test_pickle_load_read_only_file(self):
+        p = os.path.join(self.test_dir, 'test_pickle_read_only.pkl')
+        MagicDataInterface.save(self.raw_df, p)
+        os.chmod(p, stat.S_IRUSR)
+        pd.testing.assert_frame_equal(self.raw_df, MagicDataInterface.load(p))
+
+    def test_load_many(self):
+        csv_path = os.path.join(self.test_dir, 'test_load_many.csv')
+        pkl_path = os.path.join(self.test_dir, 'test_load_many.pkl')
+        self.raw_df.to_csv(csv_path, index=False)
+        MagicDataInterface.save(self.raw_df.head(10), pkl_path)
+        csv_data, pkl_data = MagicDataInterface.load_many([csv_path, pkl_path])
+        pd.testing.assert_frame_equal(self.raw_df, csv_data)
+        pd.testing.assert_frame_equal(self.raw_df.head(10), pkl_data)
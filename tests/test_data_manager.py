@@ -1,3 +1,4 @@
+import os
 import unittest
 import pytest
 from pathlib import Path
@@ -24,6 +25,48 @@ class TestDataDirectoryManager(unittest.TestCase):
             config = yaml.safe_load(open(f.name))
             self.assertEqual(config, expected_config)
 
+    def test_register_project_to_file_keeps_existing_entries(self):
+        with tempfile.TemporaryDirectory() as test_dir:
+            config_file_path = Path(test_dir, 'data_map.yaml')
+            with open(config_file_path, 'w') as f:
+                yaml.dump({'z_project': {'path': 'z_path'}}, f)
+
+            DataDirectoryManager._register_project_to_file('a_project', Path('a_path'), config_file_path)
+
+            config = yaml.safe_load(open(config_file_path))
+            self.assertEqual(list(config), ['z_project', 'a_project'])
+            self.assertEqual(config['a_project'], {'path': 'a_path'})
+            self.assertEqual(os.listdir(test_dir), ['data_map.yaml'])
+
+    def test_register_project_invalidates_cached_config(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            class TmpConfigDataDirectoryManager(DataDirectoryManager):
+                config_file_name = str(Path(test_dir, 'data_map.yaml'))
+
+            TmpConfigDataDirectoryManager.register_project('first', test_dir)
+            self.assertEqual(list(TmpConfigDataDirectoryManager._load_config()), ['first'])
+
+            TmpConfigDataDirectoryManager.register_project('second', test_dir)
+            self.assertEqual(list(TmpConfigDataDirectoryManager._load_config()), ['first', 'second'])
+        finally:
+            shutil.rmtree(test_dir)
+
+    def test_modifying_loaded_config_leaves_cached_config_intact(self):
+        test_dir = tempfile.mkdtemp()
+        try:
+            class TmpConfigDataDirectoryManager(DataDirectoryManager):
+                config_file_name = str(Path(test_dir, 'data_map.yaml'))
+
+            TmpConfigDataDirectoryManager.register_project('first', test_dir)
+            config = TmpConfigDataDirectoryManager._load_config()
+            config['first']['path'] = 'modified_path'
+            config['second'] = {'path': 'second_path'}
+            self.assertEqual(TmpConfigDataDirectoryManager._load_config(),
+                             {'first': {'path': str(Path(test_dir).resolve())}})
+        finally:
+            shutil.rmtree(test_dir)
+
 
 class TestDataManager(unittest.TestCase):
 
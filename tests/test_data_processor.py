@@ -0,0 +1,73 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import pandas as pd
+from datatc.data_processor import DataProcessorCacheManager
+
+
+def double_col_1(input_df):
+    df = input_df.copy()
+    df['col_1'] = df['col_1'] * 2
+    return df
+
+
+def failing_processor(input_df):
+    raise RuntimeError('processing failed')
+
+
+class TestDataProcessorCacheManager(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.raw_df = pd.DataFrame({'col_1': range(50), 'col_2': range(0, 100, 2)})
+        self.manager = DataProcessorCacheManager()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_save_and_load(self):
+        self.manager.save(self.raw_df, double_col_1, 'doubled', 'pkl', self.test_dir)
+        data_processor = self.manager.load('doubled', self.test_dir)
+        pd.testing.assert_frame_equal(data_processor.data, double_col_1(self.raw_df))
+        pd.testing.assert_frame_equal(data_processor.rerun(self.raw_df), double_col_1(self.raw_df))
+        self.assertIn('def double_col_1(input_df):', data_processor.view_code())
+
+    def test_load_with_file_extension(self):
+        self.manager.save(self.raw_df, double_col_1, 'doubled', 'pkl', self.test_dir)
+        data_processor = self.manager.load('doubled.pkl', self.test_dir)
+        pd.testing.assert_frame_equal(data_processor.data, double_col_1(self.raw_df))
+
+    def test_list_cached_data_processors(self):
+        self.assertEqual(self.manager.list_cached_data_processors(self.test_dir), {})
+        self.manager.save(self.raw_df, double_col_1, 'doubled', 'csv', self.test_dir)
+        self.manager.save(self.raw_df, double_col_1, 'doubled_again', 'pkl', self.test_dir)
+        self.assertEqual(self.manager.list_cached_data_processors(self.test_dir),
+                         {'doubled': 'csv', 'doubled_again': 'pkl'})
+
+    def test_list_cached_data_processors_with_unchanged_mtime(self):
+        settled_mtime_ns = time.time_ns() - 60 * 10 ** 9
+        self.manager.save(self.raw_df, double_col_1, 'doubled', 'pkl', self.test_dir)
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(self.manager.list_cached_data_processors(self.test_dir), {'doubled': 'pkl'})
+
+        # a save within the same mtime tick as the cached listing still shows up
+        self.manager.save(self.raw_df, double_col_1, 'doubled_again', 'pkl', self.test_dir)
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(self.manager.list_cached_data_processors(self.test_dir),
+                         {'doubled': 'pkl', 'doubled_again': 'pkl'})
+        data_processor = self.manager.load('doubled_again', self.test_dir)
+        pd.testing.assert_frame_equal(data_processor.data, double_col_1(self.raw_df))
+
+    def test_save_with_name_in_use_raises(self):
+        self.manager.save(self.raw_df, double_col_1, 'doubled', 'csv', self.test_dir)
+        self.assertTrue(self.manager.check_name_already_exists('doubled', self.test_dir))
+        with self.assertRaises(ValueError):
+            self.manager.save(self.raw_df, double_col_1, 'doubled', 'csv', self.test_dir)
+
+    def test_failed_save_releases_name(self):
+        with self.assertRaises(RuntimeError):
+            self.manager.save(self.raw_df, failing_processor, 'failed', 'csv', self.test_dir)
+        self.assertFalse(self.manager.check_name_already_exists('failed', self.test_dir))
+        self.assertEqual(os.listdir(self.test_dir), [])
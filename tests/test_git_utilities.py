@@ -0,0 +1,117 @@
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+from unittest import mock
+from git import Actor, Repo
+
+from datatc.git_utilities import check_for_uncommitted_git_changes_at_path, get_git_hash_from_path, get_git_repo
+
+
+class TestGetGitHashFromPath(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.repo = Repo.init(self.test_dir)
+        self.author = Actor('test', 'test@example.com')
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def commit_file(self, file_name):
+        open(os.path.join(self.test_dir, file_name), 'w').close()
+        self.repo.index.add([file_name])
+        self.repo.index.commit('add {}'.format(file_name), author=self.author, committer=self.author)
+
+    def get_expected_hash(self):
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=self.test_dir).strip().decode()
+
+    def test_hash_updates_after_new_commit(self):
+        self.commit_file('file1.txt')
+        first_hash = get_git_hash_from_path(self.test_dir)
+        self.assertEqual(first_hash, self.get_expected_hash())
+
+        self.commit_file('file2.txt')
+        second_hash = get_git_hash_from_path(self.test_dir)
+        self.assertNotEqual(second_hash, first_hash)
+        self.assertEqual(second_hash, self.get_expected_hash())
+
+    def test_hash_of_detached_head_and_packed_refs(self):
+        self.commit_file('file1.txt')
+        self.commit_file('file2.txt')
+        subprocess.check_call(['git', 'checkout', '-q', 'HEAD~1'], cwd=self.test_dir)
+        self.assertEqual(get_git_hash_from_path(self.test_dir), self.get_expected_hash())
+
+        subprocess.check_call(['git', 'checkout', '-q', '-'], cwd=self.test_dir)
+        subprocess.check_call(['git', 'pack-refs', '--all'], cwd=self.test_dir)
+        self.assertEqual(get_git_hash_from_path(self.test_dir), self.get_expected_hash())
+
+    def test_hash_does_not_start_git(self):
+        self.commit_file('file1.txt')
+        # creating the repo handle runs git to check its version, the hash lookup itself shouldn't
+        get_git_repo(self.test_dir)
+        expected_hash = self.get_expected_hash()
+        with mock.patch.object(subprocess.Popen, '__init__', side_effect=AssertionError('git was started')):
+            self.assertEqual(get_git_hash_from_path(self.test_dir), expected_hash)
+
+
+class TestCheckForUncommittedGitChangesAtPath(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.repo = Repo.init(self.test_dir)
+        author = Actor('test', 'test@example.com')
+        for file_name, contents in [('.gitignore', '# comment\n*.log\nlocal_settings.py\n'), ('run.log', ''),
+                                    ('local_settings.py', ''), ('main.py', '')]:
+            with open(os.path.join(self.test_dir, file_name), 'w') as f:
+                f.write(contents)
+            self.repo.index.add([file_name])
+        self.repo.index.commit('initial commit', author=author, committer=author)
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def modify_file(self, file_name):
+        with open(os.path.join(self.test_dir, file_name), 'a') as f:
+            f.write('changed\n')
+
+    def test_clean_repo(self):
+        self.assertFalse(check_for_uncommitted_git_changes_at_path(self.test_dir))
+
+    def test_changes_to_gitignored_files_are_ignored(self):
+        self.modify_file('run.log')
+        self.modify_file('local_settings.py')
+        self.assertFalse(check_for_uncommitted_git_changes_at_path(self.test_dir))
+
+    def test_changes_to_other_files_raise(self):
+        self.modify_file('run.log')
+        self.modify_file('main.py')
+        with self.assertRaisesRegex(RuntimeError, 'main.py'):
+            check_for_uncommitted_git_changes_at_path(self.test_dir)
+
+    def test_staged_changes_raise(self):
+        self.modify_file('main.py')
+        self.repo.index.add(['main.py'])
+        with self.assertRaisesRegex(RuntimeError, 'main.py'):
+            check_for_uncommitted_git_changes_at_path(self.test_dir)
+
+
+class TestGetGitRepo(unittest.TestCase):
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir)
+
+    def test_repo_created_after_lookup_is_found(self):
+        self.assertIsNone(get_git_repo(self.test_dir))
+        Repo.init(self.test_dir)
+        self.assertIsNotNone(get_git_repo(self.test_dir))
+
+    def test_handle_is_shared_within_a_repo(self):
+        Repo.init(self.test_dir)
+        sub_dir = os.path.join(self.test_dir, 'sub_dir')
+        os.makedirs(sub_dir)
+        self.assertIs(get_git_repo(sub_dir), get_git_repo(self.test_dir))
@@ -1,12 +1,18 @@
+import functools
+import importlib.util
+import inspect
 import unittest
 import glob
 import os
+import pickle
 import pandas as pd
 from pathlib import Path
 import shutil
+import sys
 import tempfile
+import time
 from datatc.self_aware_data import SelfAwareData, SelfAwareDataInterface, LiveTransformStep, SourceFileTransformStep,\
-    IntermediateFileTransformStep
+    IntermediateFileTransformStep, DirCache, get_func_source
 
 
 class TestSelfAwareData(unittest.TestCase):
@@ -37,6 +43,88 @@ class TestSelfAwareData(unittest.TestCase):
         df['col_1'] = df['col_1'] * factor
         return df
 
+    def test_get_func_source(self):
+        expected_source = inspect.getsource(self.transform_func)
+        self.assertEqual(get_func_source(self.transform_func), expected_source)
+        # served from the cache the second time
+        self.assertEqual(get_func_source(self.transform_func), expected_source)
+
+        wrapped_func = functools.wraps(self.transform_func)(lambda *args: self.transform_func(*args))
+        self.assertEqual(get_func_source(wrapped_func), expected_source)
+
+    def import_module_from_source(self, module_name, source):
+        module_path = os.path.join(self.test_dir, '{}.py'.format(module_name))
+        with open(module_path, 'w') as f:
+            f.write(source)
+        spec = importlib.util.spec_from_file_location(module_name, module_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+
+    def test_get_func_source_same_body_in_different_files(self):
+        module_b = self.import_module_from_source('module_b', 'def f(x):\n    return x  # module b\n')
+        module_c = self.import_module_from_source('module_c', 'def f(x):\n    return x  # module c\n')
+        self.assertEqual(get_func_source(module_b.f), 'def f(x):\n    return x  # module b\n')
+        self.assertEqual(get_func_source(module_c.f), 'def f(x):\n    return x  # module c\n')
+
+    def test_get_func_source_after_reload(self):
+        module_path = os.path.join(self.test_dir, 'reloaded_module.py')
+        with open(module_path, 'w') as f:
+            f.write('def f(x):\n    return x  # before\n')
+        sys.path.insert(0, self.test_dir)
+        try:
+            module = importlib.import_module('reloaded_module')
+            self.assertEqual(get_func_source(module.f), 'def f(x):\n    return x  # before\n')
+
+            # a comment-only edit, which leaves the function's code object unchanged
+            with open(module_path, 'w') as f:
+                f.write('def f(x):\n    return x  # after!\n')
+            file_stat = os.stat(module_path)
+            os.utime(module_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns + 10 ** 9))
+            module = importlib.reload(module)
+            self.assertEqual(get_func_source(module.f), 'def f(x):\n    return x  # after!\n')
+        finally:
+            sys.path.remove(self.test_dir)
+            sys.modules.pop('reloaded_module', None)
+
+    def test_dir_cache_keeps_latest_entry_per_dir(self):
+        dir_cache = DirCache(max_size=2)
+        # a directory modified just now is not cached, as it could still change within the same mtime tick
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'recent'), 'recent')
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'first'), 'first')
+        self.assertEqual(len(dir_cache._entries), 0)
+
+        settled_mtime_ns = time.time_ns() - 60 * 10 ** 9
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'first'), 'first')
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'not computed'), 'first')
+
+        # a change to the directory replaces its entry, rather than adding another one
+        os.makedirs(os.path.join(self.test_dir, 'new_dir'))
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns + 10 ** 9))
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'second'), 'second')
+        self.assertEqual(len(dir_cache._entries), 1)
+
+        # the least recently used directory is evicted
+        for sub_dir_name in ['sub_dir_1', 'sub_dir_2']:
+            sub_dir_path = os.path.join(self.test_dir, sub_dir_name)
+            os.makedirs(sub_dir_path)
+            os.utime(sub_dir_path, ns=(settled_mtime_ns, settled_mtime_ns))
+            dir_cache.get(sub_dir_path, lambda: sub_dir_name)
+        self.assertEqual(len(dir_cache._entries), 2)
+        self.assertNotIn((None, self.test_dir), dir_cache._entries)
+
+    def test_dir_cache_notices_change_with_unchanged_mtime(self):
+        dir_cache = DirCache()
+        settled_mtime_ns = time.time_ns() - 60 * 10 ** 9
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'first'), 'first')
+
+        # as on a file system with coarse timestamps, the directory changes but keeps its modification time
+        os.makedirs(os.path.join(self.test_dir, 'new_dir'))
+        os.utime(self.test_dir, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(dir_cache.get(self.test_dir, lambda: 'second'), 'second')
+
     def test_transform(self):
         raw_sad = SelfAwareData(self.raw_df)
         my_sad = raw_sad.transform(self.transform_func, enforce_clean_git=False)
@@ -92,6 +180,36 @@ class TestSelfAwareData(unittest.TestCase):
         manually_transformed_df = self.transform_func(self.raw_df)
         pd.testing.assert_frame_equal(rerun_df, manually_transformed_df)
 
+    def test_transform_without_capturing_source(self):
+        raw_sad = SelfAwareData(self.raw_df)
+        my_sad = raw_sad.transform(self.transform_func, enforce_clean_git=False, capture_source=False)
+        self.assertIsNone(my_sad.get_info()[-1]['code'])
+
+        sad_dir_path = SelfAwareDataInterface.save(my_sad, parent_path=self.test_dir, file_name='new_sad.csv')
+        loaded_sad = SelfAwareDataInterface.load(sad_dir_path)
+        self.assertIsNone(loaded_sad.get_info()[0]['code'])
+
+    def test_rerun_with_copy_leaves_input_unchanged(self):
+        def transform_in_place(input_df):
+            input_df['col_1'] = input_df['col_1'] * 2
+            return input_df
+
+        my_sad = SelfAwareData(self.raw_df.copy()).transform(transform_in_place, enforce_clean_git=False)
+        new_df = self.raw_df.copy()
+        rerun_df = my_sad.rerun(new_df, copy=True)
+        pd.testing.assert_frame_equal(new_df, self.raw_df)
+        pd.testing.assert_frame_equal(rerun_df, self.transform_func(self.raw_df))
+
+    def test_transform_step_loads_pickles_without_slots(self):
+        # steps pickled before TransformStepBase had __slots__ store their attributes as a dict
+        step = LiveTransformStep.__new__(LiveTransformStep)
+        step.__setstate__({'metadata': {'tag': 'old'}, 'transformer_func': self.transform_func})
+        self.assertEqual(step.tag, 'old')
+        pd.testing.assert_frame_equal(step.rerun(self.raw_df), self.transform_func(self.raw_df))
+
+        reloaded_step = pickle.loads(pickle.dumps(SourceFileTransformStep('data.csv')))
+        self.assertEqual(reloaded_step.get_info(), {'file_path': 'data.csv'})
+
     def test_get_info(self):
         raw_sad = SelfAwareData(self.raw_df)
         my_sad = raw_sad.transform(self.transform_func, tag='new_sad', enforce_clean_git=False)
@@ -147,6 +265,17 @@ class TestSelfAwareData(unittest.TestCase):
             for key in expected_info[step]:
                 self.assertEqual(transform_info[step][key], expected_info[step][key])
 
+    def test_transform_leaves_original_sequence_unchanged(self):
+        raw_sad = SelfAwareData(self.raw_df)
+        step_1_sad = raw_sad.transform(self.transform_func, tag='step_1', enforce_clean_git=False)
+        step_2a_sad = step_1_sad.transform(self.transform_func, tag='step_2a', enforce_clean_git=False)
+        step_2b_sad = step_1_sad.transform(self.transform_func, tag='step_2b', enforce_clean_git=False)
+
+        self.assertEqual(len(raw_sad.get_info()), 0)
+        self.assertEqual([step['tag'] for step in step_1_sad.get_info()], ['step_1'])
+        self.assertEqual([step['tag'] for step in step_2a_sad.get_info()], ['step_1', 'step_2a'])
+        self.assertEqual([step['tag'] for step in step_2b_sad.get_info()], ['step_1', 'step_2b'])
+
     def test_SelfAwareDataInterface_get_info(self):
         raw_sad = SelfAwareData(self.raw_df)
         my_sad = raw_sad.transform(self.transform_func, tag='new_sad', enforce_clean_git=False)
@@ -278,3 +407,18 @@ class TestSelfAwareData(unittest.TestCase):
         subpaths = glob.glob(glob_path.__str__())
         sad_dirs = [os.path.basename(file_path) for file_path in subpaths if 'sad_dir' in file_path]
         self.assertEqual(len(sad_dirs), 0)
+
+    def test_sub_file_cache_invalidated_by_new_file(self):
+        raw_sad = SelfAwareData(self.raw_df)
+        sad_file_path = raw_sad.save(Path(self.test_dir, 'raw_sad.csv'), index=False)
+        # settle the SAD dir, so that its file map is cached
+        settled_mtime_ns = time.time_ns() - 60 * 10 ** 9
+        os.utime(sad_file_path, ns=(settled_mtime_ns, settled_mtime_ns))
+        self.assertEqual(SelfAwareDataInterface.get_data_type(sad_file_path), 'csv')
+
+        # a second data file makes the SAD dir ambiguous, which must be noticed despite the cached file map, even if
+        # the directory's modification time did not change
+        self.raw_df.to_pickle(Path(sad_file_path, 'data.pkl'))
+        os.utime(sad_file_path, ns=(settled_mtime_ns, settled_mtime_ns))
+        with self.assertRaises(ValueError):
+            SelfAwareDataInterface.get_data_type(sad_file_path)